@@ -0,0 +1,64 @@
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    """Current value of the version counter ``key``."""
+    version = cache.get(key)
+    if version is None:
+        # Seeding from the clock keeps versions unique if the key is evicted,
+        # so anything built for an older version is never served again.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(keys):
+    """Current values of the version counters ``keys`` in one cache read."""
+    versions = cache.get_many(keys)
+    return [versions[key] if key in versions else get_version(key) for key in keys]
+
+
+def _modified_key(key):
+    return f"{key}:modified"
+
+
+def bump_version(key):
+    cache.set(_modified_key(key), time.time(), timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def get_last_modified(keys):
+    """
+    Unix time in whole seconds of the latest bump of any of the version
+    counters ``keys``, or None while that second is not over yet: a later
+    change in the same second would share the date and never show.
+    """
+    modified_keys = [_modified_key(key) for key in keys]
+    stamps = cache.get_many(modified_keys)
+    for key in modified_keys:
+        if key not in stamps:
+            # Unknown, e.g. evicted: assume it just changed.
+            cache.add(key, time.time(), timeout=None)
+            stamps[key] = cache.get(key) or time.time()
+    modified = int(max(stamps.values()))
+    return modified if modified < int(time.time()) else None
+
+
+def model_version_key(model):
+    return f"{model._meta.label_lower}:version"
+
+
+def get_model_version(model):
+    return get_version(model_version_key(model))
+
+
+def invalidate_model(model):
+    """Bump the version of ``model`` once the current transaction commits."""
+    transaction.on_commit(partial(bump_version, model_version_key(model)))
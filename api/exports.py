@@ -0,0 +1,135 @@
+import csv
+import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from payment.fitlers import PaymentHistoryFilter
+from payment.models import PaymentHistory
+from pet.fitlers import AdoptionHistoryFilter, PetFilter
+from pet.models import Adoption, Pet
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class Export:
+    def __init__(self, model, filterset_class, fields, ordering):
+        self.model = model
+        self.filterset_class = filterset_class
+        self.fields = fields
+        self.ordering = ordering
+
+    def get_queryset(self, data=None, request=None):
+        """
+        Filtered queryset for the export, or the invalid filterset so the
+        caller can report its errors.
+        """
+        queryset = self.model._default_manager.order_by(*self.ordering)
+        filterset = self.filterset_class(data or {}, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            return None, filterset
+        return filterset.qs, filterset
+
+
+EXPORTS = {
+    "pets": Export(
+        Pet,
+        PetFilter,
+        [
+            "id",
+            "name",
+            "breed",
+            "age",
+            "description",
+            "status",
+            "visibility",
+            "fees",
+            "category__name",
+            "owner__username",
+            "adopted_by__username",
+            "created_at",
+            "updated_at",
+        ],
+        ordering=["created_at", "id"],
+    ),
+    "adoptions": Export(
+        Adoption,
+        AdoptionHistoryFilter,
+        ["id", "pet_id", "pet__name", "adopted_by_id", "adopted_by__username", "date"],
+        ordering=["date", "id"],
+    ),
+    "payments": Export(
+        PaymentHistory,
+        PaymentHistoryFilter,
+        [
+            "id",
+            "transaction_id",
+            "amount",
+            "payment_method",
+            "status",
+            "payment_type",
+            "pet_id",
+            "pet__name",
+            "user_id",
+            "user__username",
+            "created_at",
+        ],
+        ordering=["created_at", "id"],
+    ),
+}
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export(queryset, fields, output="csv"):
+    """
+    Yield the rows of ``queryset`` as CSV or NDJSON text in chunks. Rows are
+    read with ``.iterator()`` (a server-side cursor on PostgreSQL), so memory
+    stays flat whatever the number of rows.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+    if output == "ndjson":
+        encoder = DjangoJSONEncoder()
+
+        def render(row):
+            return encoder.encode(dict(zip(fields, map(_cell, row)))) + "\n"
+
+    else:
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+
+        def render(row):
+            return writer.writerow([_cell(value) for value in row])
+
+    chunk = []
+    for row in rows:
+        chunk.append(render(row))
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def export_response(name, queryset, output="csv"):
+    export = EXPORTS[name]
+    response = StreamingHttpResponse(
+        iter_export(queryset, export.fields, output),
+        content_type=FORMATS[output],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}.{output}"'
+    return response
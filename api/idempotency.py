@@ -0,0 +1,160 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from api.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# A claim still without a response after this long belongs to a request
+# that died, so it may be taken over.
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)
+
+# Duplicates of a request in flight poll for its response instead of
+# running the handler again.
+IDEMPOTENCY_WAIT_INTERVAL = 0.1
+IDEMPOTENCY_WAIT_ATTEMPTS = 50
+IDEMPOTENCY_CLAIM_ATTEMPTS = 3
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_key_in_progress"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    payload = json.dumps(
+        [request.method, request.path, data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _is_abandoned(record, now):
+    if record.expires_at <= now:
+        return True
+    return (
+        record.status_code is None
+        and record.created_at <= now - IDEMPOTENCY_LOCK_TIMEOUT
+    )
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Insert the record for ``key``. Returns ``(record, True)`` when this
+    request should be processed, or ``(existing record, False)``.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + IDEMPOTENCY_KEY_TTL,
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    if record is not None and _is_abandoned(record, now):
+        IdempotencyKey.objects.filter(
+            pk=record.pk, status_code=record.status_code
+        ).delete()
+        record = None
+    return record, False
+
+
+def wait_for_response(record):
+    """
+    Poll until the request holding ``record`` stored its response. Returns
+    None if that request failed and released the key.
+    """
+    for _ in range(IDEMPOTENCY_WAIT_ATTEMPTS):
+        if record.status_code is not None:
+            return record
+        time.sleep(IDEMPOTENCY_WAIT_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    if record.status_code is not None:
+        return record
+    raise IdempotencyKeyInProgress()
+
+
+def replay_response(record):
+    return Response(
+        record.response,
+        status=record.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent_response(request, key, handle_request):
+    """
+    Run ``handle_request`` at most once per user and ``key``.
+
+    The key is claimed with a unique insert before the handler runs. A
+    successful response is stored in the handler's transaction and replayed
+    to retries until the key expires; failures release the key so the
+    client can retry. Concurrent duplicates wait for the first response.
+    """
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValidationError(
+            {
+                IDEMPOTENCY_KEY_HEADER: (
+                    f"Must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters long."
+                )
+            }
+        )
+
+    fingerprint = request_fingerprint(request)
+    for _ in range(IDEMPOTENCY_CLAIM_ATTEMPTS):
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if record is None:
+            # Expired, abandoned or released in the meantime.
+            continue
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        if claimed:
+            return _process(record, handle_request)
+
+        record = wait_for_response(record)
+        if record is not None:
+            return replay_response(record)
+    raise IdempotencyKeyInProgress()
+
+
+def _process(record, handle_request):
+    try:
+        with transaction.atomic():
+            response = handle_request()
+            if status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=["status_code", "response"])
+                return response
+    except Exception:
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+        raise
+
+    IdempotencyKey.objects.filter(pk=record.pk).delete()
+    return response
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORTS, FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream pets, adoptions or payments to a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=sorted(EXPORTS))
+        parser.add_argument("--output", choices=sorted(FORMATS), default="csv")
+        parser.add_argument(
+            "--file", help="Write to this path instead of standard output."
+        )
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="KEY=VALUE",
+            help="Filter like the API query string, e.g. status=success. Repeatable.",
+        )
+
+    def handle(self, *args, **options):
+        data = {}
+        for item in options["filter"]:
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Invalid filter {item!r}, expected KEY=VALUE.")
+            data[key] = value
+
+        export = EXPORTS[options["name"]]
+        queryset, filterset = export.get_queryset(data)
+        if queryset is None:
+            raise CommandError(f"Invalid filters: {filterset.errors.as_json()}")
+
+        chunks = iter_export(queryset, export.fields, options["output"])
+        if options["file"]:
+            with open(options["file"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
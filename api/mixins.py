@@ -0,0 +1,190 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from api.cache import get_last_modified, get_versions, model_version_key
+from api.idempotency import IDEMPOTENCY_KEY_HEADER, idempotent_response
+from api.serializers import get_values_plan
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    Adds ``ETag`` and ``Last-Modified`` headers to ``list`` and ``retrieve``
+    and answers ``If-None-Match`` and ``If-Modified-Since`` with ``304``
+    before the handler runs.
+
+    Both come from the version counters of the models in ``etag_models``
+    (or ``get_version_keys()``), which are bumped in the cache whenever
+    those rows change, deletes included. List every model whose fields are
+    rendered, nested ones too. With the shared cache of the settings a
+    ``304`` makes no database query.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    etag_models = ()
+
+    etag = None
+    last_modified = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in ("GET", "HEAD"):
+            return
+        if self.action not in self.conditional_actions:
+            return
+
+        self.etag = self.get_etag()
+        if self.etag is None:
+            return
+        self.last_modified = self.get_last_modified()
+
+        response = get_conditional_response(
+            request._request, etag=self.etag, last_modified=self.last_modified
+        )
+        if response is not None and response.status_code == 304:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag is not None and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            if self.last_modified is not None:
+                response["Last-Modified"] = http_date(self.last_modified)
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def get_etag(self):
+        """The ETag of the response, or None to skip conditional handling."""
+        parts = [
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            str(self.request.user.pk),
+            str(self.request.user.is_staff),
+            *self.get_etag_parts(),
+        ]
+        digest = hashlib.sha1("|".join(parts).encode()).hexdigest()
+        return quote_etag(digest)
+
+    def get_version_keys(self):
+        """Cache keys of the version counters the representation depends on."""
+        return [model_version_key(model) for model in self.etag_models]
+
+    def get_etag_parts(self):
+        """Values that change whenever the representation may change."""
+        return [str(version) for version in get_versions(self.get_version_keys())]
+
+    def get_last_modified(self):
+        """Unix time of the latest change, or None to send no Last-Modified."""
+        keys = self.get_version_keys()
+        return get_last_modified(keys) if keys else None
+
+
+class ValuesListMixin:
+    """
+    Opt-in read-only fast path for list actions.
+
+    For the actions named in ``values_actions`` the queryset is fetched with
+    ``.values()`` and rendered through the serializer's compiled
+    ``ValuesPlan``, producing the same JSON without building model instances
+    or walking DRF's attribute machinery. Serializers the plan cannot handle
+    fall back to the regular path.
+
+    Other reads (``retrieve`` and lists outside ``values_actions``) still
+    build instances, but only load the columns of the serialized fields,
+    after ``?fields=``/``?omit=``, plus ``only_required_fields``, the fields
+    the view itself reads. Relations joined by ``select_related`` that no
+    field needs are reduced to their primary key.
+    """
+
+    values_actions = ()
+    only_actions = ("list", "retrieve")
+    only_required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        if self.action not in (*self.only_actions, *self.values_actions):
+            return queryset
+        fields = self.get_only_fields(queryset)
+        return queryset.only(*fields) if fields else queryset
+
+    def get_only_fields(self, queryset):
+        """Lookups to pass to ``.only()``, or None to load every column."""
+        if queryset.query.select_related is True:
+            return None
+        serializer = self.get_serializer()
+        plan = get_values_plan(type(serializer))
+        if plan is None:
+            return None
+
+        fields = set(plan.get_paths(serializer.fields))
+        fields.update(self.only_required_fields)
+        for relation, model in _select_related_paths(
+            queryset.model, queryset.query.select_related
+        ):
+            if not any(field.startswith(f"{relation}__") for field in fields):
+                # Keeps select_related valid, loading just the key.
+                fields.add(f"{relation}__{model._meta.pk.name}")
+        return sorted(fields)
+
+    def list(self, request, *args, **kwargs):
+        response = self.get_values_response(self.filter_queryset(self.get_queryset()))
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
+
+    def get_values_response(self, queryset):
+        if self.action not in self.values_actions:
+            return None
+
+        serializer = self.get_serializer()
+        plan = get_values_plan(type(serializer))
+        if plan is None:
+            return None
+
+        queryset = queryset.values(*plan.get_paths(serializer.fields))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.to_representation(page, serializer))
+        return Response(plan.to_representation(queryset, serializer))
+
+
+def _select_related_paths(model, related, prefix=""):
+    for name, children in (related or {}).items():
+        field = model._meta.get_field(name)
+        path = f"{prefix}{name}"
+        yield path, field.related_model
+        yield from _select_related_paths(field.related_model, children, f"{path}__")
+
+
+class IdempotentCreateMixin:
+    """
+    Makes ``create`` safe to retry: requests sent with an ``Idempotency-Key``
+    header are processed once per user and key, and retries get the stored
+    response back without running the handler again.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None or not request.user.is_authenticated:
+            return super().create(request, *args, **kwargs)
+        return idempotent_response(
+            request,
+            key,
+            lambda: super(IdempotentCreateMixin, self).create(request, *args, **kwargs),
+        )
@@ -0,0 +1,257 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Sending ``?cursor=`` switches the endpoint to keyset pagination: rows are
+    ordered on the requested ``?ordering=`` fields (or ``keyset_ordering``)
+    with the primary key as tie breaker, and each page is fetched with a
+    ``WHERE (field, id) < (:field, :id)`` filter instead of ``OFFSET``. No
+    ``COUNT(*)`` is issued and ``next``/``previous`` are opaque cursors.
+
+    Rows with NULL in a nullable ordering field come after every other row,
+    whichever the direction.
+    """
+
+    cursor_query_param = "cursor"
+    keyset_ordering = ("-created_at",)
+    invalid_cursor_message = "Invalid cursor"
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_keyset_ordering(request, queryset, view)
+        self.nullable = {
+            field.lstrip("-")
+            for field in self.ordering
+            if _is_nullable(self.model, field.lstrip("-"))
+        }
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [_invert(field) for field in ordering]
+        # Walking backwards meets the NULLs first.
+        nulls_last = not reverse
+
+        fields = getattr(queryset, "_fields", None)
+        if fields:
+            # .values() rows need the ordering columns to build cursors.
+            missing = [f.lstrip("-") for f in ordering if f.lstrip("-") not in fields]
+            queryset = queryset.values(*fields, *missing)
+
+        queryset = queryset.order_by(*self.get_keyset_order_by(ordering, nulls_last))
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(ordering, position, nulls_last)
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_keyset_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        ordering = list(ordering or self.keyset_ordering)
+        pk_name = self.model._meta.pk.name
+        if not any(field.lstrip("-") in ("pk", pk_name) for field in ordering):
+            descending = ordering[-1].startswith("-")
+            ordering.append(("-" if descending else "") + pk_name)
+        return ordering
+
+    def get_keyset_order_by(self, ordering, nulls_last):
+        order_by = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if name not in self.nullable:
+                # Plain ordering keeps matching the column indexes.
+                order_by.append(field)
+                continue
+            expression = F(name)
+            nulls = {"nulls_last": True} if nulls_last else {"nulls_first": True}
+            if field.startswith("-"):
+                order_by.append(expression.desc(**nulls))
+            else:
+                order_by.append(expression.asc(**nulls))
+        return order_by
+
+    def get_keyset_filter(self, ordering, position, nulls_last=True):
+        # Expands the row comparison (a, b, c) > (x, y, z) into
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z).
+        # SQL comparisons with NULL are never true, so "after" and "equal"
+        # spell out where NULLs sort for nullable fields.
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            if value is None:
+                after = None if nulls_last else Q(**{f"{name}__isnull": False})
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__{lookup}": value})
+                if nulls_last and name in self.nullable:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        position = [
+            _to_json(_get_value(obj, field.lstrip("-"))) for field in self.ordering
+        ]
+        payload = {"p": position}
+        if reverse:
+            payload["r"] = 1
+
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        ).decode()
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position = payload["p"]
+            reverse = bool(payload.get("r"))
+            if len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                _resolve_field(self.model, field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (
+            binascii.Error,
+            FieldDoesNotExist,
+            KeyError,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def get_html_context(self):
+        if self.keyset:
+            return {
+                "previous_url": self.get_previous_link(),
+                "next_url": self.get_next_link(),
+            }
+        return super().get_html_context()
+
+
+def _invert(field):
+    return field[1:] if field.startswith("-") else "-" + field
+
+
+def _resolve_field(model, path):
+    names = path.split("__")
+    for name in names[:-1]:
+        model = model._meta.get_field(name).related_model
+    name = names[-1]
+    if name == "pk":
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _is_nullable(model, path):
+    names = path.split("__")
+    for name in names[:-1]:
+        field = model._meta.get_field(name)
+        if field.null:
+            return True
+        model = field.related_model
+    name = names[-1]
+    return name != "pk" and model._meta.get_field(name).null
+
+
+def _get_value(obj, path):
+    if isinstance(obj, dict):
+        return obj[path]
+    for name in path.split("__"):
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
+
+def _to_json(value):
+    # DjangoJSONEncoder truncates microseconds, which would make the cursor
+    # skip rows sharing the same millisecond.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
@@ -0,0 +1,249 @@
+from types import SimpleNamespace
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.fields import empty
+from rest_framework.relations import PKOnlyObject
+
+_plans = {}
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests pick the serialized fields with ``?fields=a,b`` and
+    drop some with ``?omit=c``. List views using ``ValuesListMixin`` only
+    select the columns and joins the remaining fields need.
+
+    Serializers embedded in another document get ``sparse_fieldsets=False``
+    in their context, since the parameters name the fields of the top level.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        if not self.context.get("sparse_fieldsets", True):
+            return
+
+        requested = _split(request.query_params.get(self.fields_query_param))
+        omitted = _split(request.query_params.get(self.omit_query_param))
+        for name in list(self.fields):
+            if (requested and name not in requested) or name in omitted:
+                self.fields.pop(name)
+
+
+class PreloadedRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys from ``context[context_key]``, a mapping loaded
+    once per batch with ``preload_related``, instead of a query per item.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pk_field = self.get_queryset().model._meta.pk
+        try:
+            pk = pk_field.to_python(data)
+        except DjangoValidationError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.context[self.context_key][pk]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+
+def preload_related(items, name, queryset):
+    """Fetch the objects ``items`` reference in their ``name`` key in one query."""
+    pk_field = queryset.model._meta.pk
+    pks = set()
+    for item in items:
+        if not isinstance(item, dict) or not item.get(name):
+            continue
+        try:
+            pks.add(pk_field.to_python(item[name]))
+        except DjangoValidationError:
+            continue
+    return queryset.in_bulk(pks)
+
+
+class ValuesPlan:
+    """
+    Read-only plan that renders ``.values()`` rows into the same shape as a
+    ``ModelSerializer``.
+
+    Compiled once per serializer class: it maps every readable field to the
+    ``.values()`` lookup it reads and keeps nested serializers as sub-plans.
+    Formatting still goes through each bound field's ``to_representation`` so
+    the output is identical; only attribute lookup and model instantiation
+    are skipped.
+
+    ``SerializerMethodField``s are supported when the serializer declares the
+    model attributes the method reads in ``Meta.values_method_sources``::
+
+        values_method_sources = {"name": ["first_name", "last_name"]}
+    """
+
+    FIELD = "field"
+    RELATED = "related"
+    METHOD = "method"
+    NESTED = "nested"
+
+    def __init__(self, entries, null_path=None):
+        self.entries = entries
+        self.null_path = null_path
+
+    def get_paths(self, fields=None):
+        """Lookups to pass to ``.values()``, limited to ``fields`` if given."""
+        paths = []
+        if self.null_path:
+            paths.append(self.null_path)
+        for name, kind, path, hops in self.entries:
+            if fields is not None and name not in fields:
+                continue
+            if kind == self.NESTED:
+                paths.extend(path.get_paths())
+            elif kind == self.METHOD:
+                paths.extend(path.values())
+            else:
+                paths.extend(hops)
+                paths.append(path)
+        return list(dict.fromkeys(paths))
+
+    def to_representation(self, rows, serializer):
+        fields = serializer.fields
+        return [self.represent(row, fields) for row in rows]
+
+    def represent(self, row, fields):
+        ret = {}
+        for name, kind, path, hops in self.entries:
+            field = fields.get(name)
+            if field is None:
+                continue
+            if kind == self.NESTED:
+                if row[path.null_path] is None:
+                    ret[name] = None
+                else:
+                    ret[name] = path.represent(row, field.fields)
+                continue
+
+            if kind == self.METHOD:
+                value = SimpleNamespace(
+                    **{attr: row[lookup] for attr, lookup in path.items()}
+                )
+                ret[name] = field.to_representation(value)
+                continue
+
+            if any(row[hop] is None for hop in hops):
+                # Same outcome as DRF's Field.get_attribute hitting a null
+                # relation half way through a dotted source.
+                if field.default is not empty:
+                    ret[name] = field.get_default()
+                elif field.allow_null:
+                    ret[name] = None
+                elif not field.required:
+                    continue
+                else:
+                    raise AttributeError(f"{path} is null")
+                continue
+
+            value = row[path]
+            if value is None:
+                ret[name] = None
+            elif kind == self.RELATED:
+                ret[name] = field.to_representation(PKOnlyObject(pk=value))
+            else:
+                ret[name] = field.to_representation(value)
+        return ret
+
+
+def get_values_plan(serializer_class):
+    """Return the cached plan for a serializer class, or None if unsupported."""
+    if serializer_class not in _plans:
+        try:
+            plan = _compile(serializer_class(), serializer_class.Meta.model)
+        except (AttributeError, FieldDoesNotExist, UnsupportedField):
+            plan = None
+        _plans[serializer_class] = plan
+    return _plans[serializer_class]
+
+
+def _compile(serializer, model, prefix=(), null_path=None):
+    # Lookups are always resolved from the root model, nested serializers
+    # only extend the prefix.
+    method_sources = getattr(serializer.Meta, "values_method_sources", {})
+    entries = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        if isinstance(field, serializers.SerializerMethodField):
+            if name not in method_sources:
+                raise UnsupportedField(name)
+            lookups = {
+                attr: _lookup(model, prefix, attr.split("."))[0]
+                for attr in method_sources[name]
+            }
+            entries.append((name, ValuesPlan.METHOD, lookups, []))
+            continue
+
+        if field.source == "*":
+            raise UnsupportedField(name)
+
+        lookup, target = _lookup(model, prefix, field.source_attrs)
+        # Relations crossed by a dotted source such as "category.name".
+        hops = [
+            "__".join(prefix + tuple(field.source_attrs[: index + 1]))
+            for index in range(len(field.source_attrs) - 1)
+        ]
+        if isinstance(field, serializers.ModelSerializer):
+            if not target.is_relation or target.many_to_many:
+                raise UnsupportedField(name)
+            nested = _compile(
+                field, model, prefix + tuple(field.source_attrs), null_path=lookup
+            )
+            entries.append((name, ValuesPlan.NESTED, nested, []))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            if not target.many_to_one and not target.one_to_one:
+                raise UnsupportedField(name)
+            entries.append((name, ValuesPlan.RELATED, lookup, hops))
+        elif isinstance(field, serializers.BaseSerializer) or target.is_relation:
+            raise UnsupportedField(name)
+        else:
+            entries.append((name, ValuesPlan.FIELD, lookup, hops))
+    return ValuesPlan(entries, null_path=null_path)
+
+
+def _lookup(model, prefix, attrs):
+    """
+    Resolve ``prefix + attrs`` to a ``.values()`` lookup, allowing only
+    forward to-one relations so each serialized object stays one row.
+    """
+    path = list(prefix) + list(attrs)
+    current = model
+    target = None
+    for index, attr in enumerate(path):
+        target = current._meta.get_field(attr)
+        if index < len(path) - 1:
+            if not (target.many_to_one or target.one_to_one) or target.auto_created:
+                raise UnsupportedField(attr)
+            current = target.related_model
+    if target.auto_created and not target.concrete:
+        raise UnsupportedField(path[-1])
+    return "__".join(path), target
+
+
+def _split(value):
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
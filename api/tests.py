@@ -1,3 +1,280 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from api.idempotency import IDEMPOTENCY_WAIT_ATTEMPTS, request_fingerprint
+from api.models import IdempotencyKey
+from category.models import Category
+from payment.models import PaymentHistory
+from pet.models import Pet
+from review.models import Review
+
+User = get_user_model()
+
+
+def clock(seconds):
+    return mock.patch("api.cache.time.time", return_value=seconds)
+
+
+class ConditionalGetTests(TestCase):
+    """``ETag``/``Last-Modified`` of ``ConditionalGetMixin`` endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username="user", email="user@example.com", first_name="Ann"
+        )
+        cls.pet = Pet.objects.create(
+            name="Rex",
+            breed="lab",
+            age=2,
+            description="friendly",
+            status=Pet.APPROVED,
+            visibility=Pet.PUBLIC,
+            category=Category.objects.create(name="Dog"),
+        )
+        PaymentHistory.objects.create(
+            transaction_id="tx1",
+            amount=10,
+            payment_method="card",
+            pet=cls.pet,
+            user=cls.user,
+        )
+        Review.objects.create(pet=cls.pet, reviewer=cls.user, comments="Good")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def change(self, seconds, obj, **fields):
+        with clock(seconds), self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+
+    def test_not_modified_without_a_query(self):
+        etag = self.client.get("/api/v1/payments/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/payments/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        # Versions never bumped count as changed when first read.
+        with clock(1000.5):
+            self.client.get("/api/v1/payments/")
+        self.change(1000.5, self.pet, fees=5)
+        with clock(1005.0):
+            response = self.client.get("/api/v1/payments/")
+            self.assertEqual(response["Last-Modified"], http_date(1000))
+            response = self.client.get(
+                "/api/v1/payments/", HTTP_IF_MODIFIED_SINCE=http_date(1000)
+            )
+        self.assertEqual(response.status_code, 304)
+
+        self.change(1006.0, self.pet, name="Max")
+        with clock(1010.0):
+            response = self.client.get(
+                "/api/v1/payments/", HTTP_IF_MODIFIED_SINCE=http_date(1000)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Last-Modified"], http_date(1006))
+
+    def test_no_last_modified_within_the_changed_second(self):
+        self.change(1000.2, self.pet, fees=5)
+        with clock(1000.7):
+            response = self.client.get(
+                "/api/v1/payments/", HTTP_IF_MODIFIED_SINCE=http_date(1000)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_nested_pet_changes_the_payment_etag(self):
+        etag = self.client.get("/api/v1/payments/")["ETag"]
+        self.change(1000.0, self.pet, name="Max")
+        response = self.client.get("/api/v1/payments/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["pet_details"]["name"], "Max")
+
+    def test_nested_category_changes_the_payment_etag(self):
+        etag = self.client.get("/api/v1/payments/")["ETag"]
+        self.change(1000.0, self.pet.category, name="Hound")
+        response = self.client.get("/api/v1/payments/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_reviewer_rename_changes_the_review_etag(self):
+        url = f"/api/v1/pets/{self.pet.pk}/reviews/"
+        etag = self.client.get(url)["ETag"]
+        self.change(1000.0, self.user, first_name="Bea")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_user_update_changes_the_review_etag(self):
+        url = f"/api/v1/pets/{self.pet.pk}/reviews/"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(last_name="Lee")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+def payment(transaction_id="tx1", amount="10.00"):
+    return {
+        "transaction_id": transaction_id,
+        "amount": amount,
+        "payment_method": "card",
+    }
+
+
+class IdempotentCreateTests(TestCase):
+    """``Idempotency-Key`` handling of ``IdempotentCreateMixin``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, data, key="key-1"):
+        return self.client.post(
+            "/api/v1/payments/", data, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_replay(self):
+        first = self.create(payment())
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first)
+
+        with mock.patch(
+            "payment.views.PaymentHistoryViewSet.perform_create"
+        ) as perform_create:
+            second = self.create(payment())
+        perform_create.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(PaymentHistory.objects.filter(user=self.user).count(), 1)
+
+    def test_same_key_with_a_different_body(self):
+        self.create(payment())
+        response = self.create(payment(amount="20.00"))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data["detail"].code, "idempotency_key_reused")
+        self.assertEqual(PaymentHistory.objects.filter(user=self.user).count(), 1)
+
+    def test_keys_are_per_user(self):
+        self.create(payment())
+        other = User.objects.create(username="other", email="other@example.com")
+        self.client.force_authenticate(other)
+        response = self.create(payment(transaction_id="tx2"))
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_failed_request_releases_the_key(self):
+        response = self.create({"amount": "10.00"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.create(payment())
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_duplicate_of_a_request_in_flight(self):
+        IdempotencyKey.objects.create(
+            user=self.user,
+            key="key-1",
+            fingerprint=request_fingerprint(
+                SimpleNamespace(method="POST", path="/api/v1/payments/", data=payment())
+            ),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        with mock.patch("api.idempotency.time.sleep") as sleep:
+            response = self.create(payment())
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(sleep.call_count, IDEMPOTENCY_WAIT_ATTEMPTS)
+        self.assertFalse(PaymentHistory.objects.exists())
+
+    def test_abandoned_claim_is_taken_over(self):
+        record = IdempotencyKey.objects.create(
+            user=self.user,
+            key="key-1",
+            fingerprint=request_fingerprint(
+                SimpleNamespace(method="POST", path="/api/v1/payments/", data=payment())
+            ),
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        IdempotencyKey.objects.filter(pk=record.pk).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        response = self.create(payment())
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_clear_idempotency_keys(self):
+        self.create(payment(), key="expired")
+        self.create(payment(transaction_id="tx2"), key="live")
+        IdempotencyKey.objects.filter(key="expired").update(expires_at=timezone.now())
+
+        out = StringIO()
+        call_command("clear_idempotency_keys", stdout=out)
+        self.assertIn("Deleted 1 expired idempotency key(s).", out.getvalue())
+        self.assertQuerySetEqual(
+            IdempotencyKey.objects.values_list("key", flat=True), ["live"]
+        )
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "concurrent writers need PostgreSQL; SQLite locks the whole database",
+)
+class ConcurrentIdempotentCreateTests(TransactionTestCase):
+    """Two first requests with the same key race for its claim."""
+
+    def test_one_payment_for_concurrent_duplicates(self):
+        user = User.objects.create(username="user", email="user@example.com")
+        barrier = threading.Barrier(2)
+        responses = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                responses.append(
+                    client.post(
+                        "/api/v1/payments/",
+                        payment(),
+                        format="json",
+                        HTTP_IDEMPOTENCY_KEY="key-1",
+                    )
+                )
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=post) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertEqual(
+            sorted(r.get("Idempotent-Replayed", "") for r in responses),
+            ["", "true"],
+        )
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(PaymentHistory.objects.count(), 1)
@@ -1,16 +1,19 @@
 from codecs import lookup
 from django.urls import include, path, re_path
 from rest_framework.routers import SimpleRouter
+from api.views import ExportViewSet
 from category.views import CategoryViewSet
 from rest_framework_nested.routers import NestedSimpleRouter
 from pet.views import AdoptionHistoryViewSet, PetViewSet
-from review.views import ReviewViewSet
+from review.views import ReviewImageViewSet, ReviewViewSet
 from payment.views import PaymentHistoryViewSet
 
 router = SimpleRouter()
 router.register("categories", CategoryViewSet, basename="category")
 router.register("pets", PetViewSet, basename="pets")
 router.register("payments", PaymentHistoryViewSet, basename="payments")
+router.register("exports", ExportViewSet, basename="exports")
+router.register("review-images", ReviewImageViewSet, basename="review-images")
 
 pet_router = NestedSimpleRouter(router, "pets", lookup="pets")
 pet_router.register("adoptions", AdoptionHistoryViewSet, basename="adoptions")
@@ -1,3 +1,71 @@
-from django.shortcuts import render
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
-# Create your views here.
+from api.exports import FORMATS, EXPORTS, export_response
+
+output_parameter = openapi.Parameter(
+    "output",
+    openapi.IN_QUERY,
+    description="Export format, `csv` (default) or `ndjson`.",
+    type=openapi.TYPE_STRING,
+    enum=list(FORMATS),
+)
+
+
+class ExportViewSet(viewsets.ViewSet):
+    swagger_tags = ["exports"]
+    permission_classes = [permissions.IsAdminUser]
+
+    def _export(self, request, name):
+        output = request.query_params.get("output", "csv")
+        if output not in FORMATS:
+            return Response(
+                {"details": f"Unsupported output {output!r}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset, filterset = EXPORTS[name].get_queryset(request.query_params, request)
+        if queryset is None:
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(name, queryset, output)
+
+    @swagger_auto_schema(
+        operation_summary="Export pets",
+        operation_description=(
+            "Stream every pet matching the pet list filters as CSV or NDJSON.\n\n"
+            "- Only admins can export data."
+        ),
+        manual_parameters=[output_parameter],
+    )
+    @action(detail=False, methods=["get"])
+    def pets(self, request):
+        return self._export(request, "pets")
+
+    @swagger_auto_schema(
+        operation_summary="Export adoptions",
+        operation_description=(
+            "Stream every adoption matching the adoption history filters as CSV "
+            "or NDJSON.\n\n"
+            "- Only admins can export data."
+        ),
+        manual_parameters=[output_parameter],
+    )
+    @action(detail=False, methods=["get"])
+    def adoptions(self, request):
+        return self._export(request, "adoptions")
+
+    @swagger_auto_schema(
+        operation_summary="Export payments",
+        operation_description=(
+            "Stream every payment matching the payment history filters as CSV or "
+            "NDJSON.\n\n"
+            "- Only admins can export data."
+        ),
+        manual_parameters=[output_parameter],
+    )
+    @action(detail=False, methods=["get"])
+    def payments(self, request):
+        return self._export(request, "payments")
@@ -12,3 +12,17 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
         ]
+
+
+class CategoryCatalogSerializer(CategorySerializer):
+    pet_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ["pet_count"]
+
+
+class CategoryCatalogPageSerializer(serializers.Serializer):
+    count = serializers.IntegerField()
+    next = serializers.CharField(allow_null=True)
+    previous = serializers.CharField(allow_null=True)
+    results = CategoryCatalogSerializer(many=True)
@@ -1,3 +1,72 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from category.models import Category
+from pet.models import Pet
+from pet.moderation import transition_pets
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class CategoryCatalogTests(TestCase):
+    """The cached category list and its ``pet_count``s."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dog = Category.objects.create(name="Dog")
+        cls.cat = Category.objects.create(name="Cat")
+        cls.pets = [
+            Pet.objects.create(
+                name=f"pet{index}",
+                breed="lab",
+                age=2,
+                description="friendly",
+                status=status,
+                visibility=Pet.PUBLIC,
+                category=cls.dog,
+            )
+            for index, status in enumerate(
+                [Pet.APPROVED, Pet.APPROVED, Pet.PENDING, Pet.PENDING]
+            )
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def catalog(self):
+        response = self.client.get("/api/v1/categories/")
+        self.assertEqual(response.status_code, 200)
+        return {item["name"]: item["pet_count"] for item in response.data["results"]}
+
+    def test_warm_hit_makes_no_query(self):
+        self.assertEqual(self.catalog(), {"Cat": 0, "Dog": 2})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.catalog(), {"Cat": 0, "Dog": 2})
+
+    def test_category_save_refreshes(self):
+        self.catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cat.name = "Kitten"
+            self.cat.save()
+        self.assertEqual(self.catalog(), {"Dog": 2, "Kitten": 0})
+
+    def test_pet_status_change_refreshes(self):
+        self.catalog()
+        pet = self.pets[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            pet.status = Pet.SUSPENDED
+            pet.save()
+        self.assertEqual(self.catalog(), {"Cat": 0, "Dog": 1})
+
+    def test_moderation_update_refreshes(self):
+        self.catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = transition_pets(Pet.objects.all(), Pet.APPROVED)
+        self.assertEqual(updated, 2)
+        self.assertEqual(self.catalog(), {"Cat": 0, "Dog": 4})
@@ -1,9 +1,16 @@
-from rest_framework import viewsets
-from rest_framework.permissions import AllowAny  # adjust as needed
+from django.db.models import Count, Q
+from rest_framework import status, viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from category.models import Category
-from category.paginations import CategoryPagination
-from category.serializers import CategorySerializer
+from category.serializers import (
+    CategoryCatalogPageSerializer,
+    CategoryCatalogSerializer,
+    CategorySerializer,
+)
+from pet.cache import cached_response
+from pet.models import Pet
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -11,18 +18,41 @@ class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by("name")
     permission_classes = [AllowAny]
     serializer_class = CategorySerializer
-    pagination_class = CategoryPagination
+
+    def get_catalog(self):
+        """Every category with its number of approved public pets."""
+        categories = Category.objects.annotate(
+            pet_count=Count(
+                "pets",
+                filter=Q(pets__status=Pet.APPROVED, pets__visibility=Pet.PUBLIC),
+            )
+        ).order_by("name")
+        results = CategoryCatalogSerializer(categories, many=True).data
+        return Response(
+            {
+                "count": len(results),
+                "next": None,
+                "previous": None,
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @swagger_auto_schema(
         operation_summary="List categories",
         operation_description=(
-            "Retrieve a paginated list of all categories.\n\n"
+            "Retrieve all categories in one response, with the number of "
+            "approved public pets in each.\n\n"
             "- Publicly accessible (no authentication required).\n"
-            "- Results are ordered alphabetically by name."
+            "- Results are ordered alphabetically by name.\n"
+            "- Keeps the paginated response shape, but `next` is always null.\n"
+            "- Served from the catalog cache, refreshed when categories or pets "
+            "change."
         ),
+        responses={200: CategoryCatalogPageSerializer},
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return cached_response(request, "categories", self.get_catalog)
 
     @swagger_auto_schema(
         operation_summary="Create a category",
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 import cloudinary
+from django.core.exceptions import ImproperlyConfigured
 from decouple import config
 import dj_database_url
 from datetime import timedelta
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "debug_toolbar",
     "rest_framework",
     "djoser",
@@ -105,6 +108,53 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# The pet catalog, facet and category caches and their version keys must be
+# shared by every worker and instance, or invalidations made by one never
+# reach the others, and a cache hit should not touch the database. Set
+# CACHE_URL=redis://... (needs the redis package) or
+# CACHE_URL=memcached://host:port (needs pymemcache); one of them is required
+# on Vercel, which sets VERCEL=1. Without it, local development uses a
+# per-process memory cache.
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("memcached://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": CACHE_URL.removeprefix("memcached://"),
+        }
+    }
+elif config("VERCEL", default=False, cast=bool):
+    raise ImproperlyConfigured(
+        "Set CACHE_URL to a Redis or memcached server: the cache must be shared "
+        "by every instance."
+    )
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Pet views are buffered per process and flushed by a timer thread, see
+# pet/counters.py. A frozen serverless instance runs neither the timer nor
+# the exit flush, so every view is written straight away on Vercel.
+PET_VIEW_FLUSH_INTERVAL = config(
+    "PET_VIEW_FLUSH_INTERVAL",
+    default=0 if config("VERCEL", default=False, cast=bool) else 30,
+    cast=int,
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -149,15 +199,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "user.CustomUser"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("user.authentication.ClaimsJWTAuthentication",),
 }
 
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
-    "ACCESS_TOKEN_LIFETIME": timedelta(hours=24),
+    # Short lived: access tokens carry is_staff/is_active, which are trusted
+    # until the token expires, see user/authentication.py. Refreshing
+    # re-reads them from the database.
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(weeks=1),
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.ClaimsTokenRefreshSerializer",
 }
 
 DJOSER = {
@@ -199,6 +252,36 @@ cloudinary.config(
     api_secret=CLOUDINARY_STORAGE["API_SECRET"],
 )
 
+# Review images are spooled to local disk and uploaded to the storage
+# backend by a background worker pool, see review/uploads.py. The deployment
+# directory is read-only on Vercel, so the spool defaults to the temp dir.
+# `python manage.py process_review_images` finishes uploads left behind by a
+# stopped process, but only from a spool it can read: the same host, or a
+# spool directory shared by every instance. The temp dir of a frozen
+# serverless instance is not, so its stalled uploads end up failed.
+REVIEW_IMAGE_STORAGE = config(
+    "REVIEW_IMAGE_STORAGE", default="review.storage.CloudinaryImageStorage"
+)
+REVIEW_IMAGE_SPOOL_DIR = config(
+    "REVIEW_IMAGE_SPOOL_DIR",
+    default=str(Path(tempfile.gettempdir()) / "notunbari" / "review-images"),
+)
+REVIEW_IMAGE_UPLOAD_WORKERS = config("REVIEW_IMAGE_UPLOAD_WORKERS", default=4, cast=int)
+# Used by review.storage.LocalImageStorage.
+REVIEW_IMAGE_LOCAL_ROOT = config(
+    "REVIEW_IMAGE_LOCAL_ROOT", default=str(BASE_DIR / "media" / "reviews")
+)
+REVIEW_IMAGE_LOCAL_URL = config("REVIEW_IMAGE_LOCAL_URL", default="/media/reviews/")
+# Thumbnails generated on demand by review/derivatives.py. Only a cache, so
+# it also defaults to the temp dir.
+REVIEW_IMAGE_DERIVATIVE_DIR = config(
+    "REVIEW_IMAGE_DERIVATIVE_DIR",
+    default=str(Path(tempfile.gettempdir()) / "notunbari" / "review-derivatives"),
+)
+REVIEW_IMAGE_DERIVATIVE_WORKERS = config(
+    "REVIEW_IMAGE_DERIVATIVE_WORKERS", default=2, cast=int
+)
+
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = config("EMAIL_HOST", default="")
@@ -0,0 +1,128 @@
+from django.db import IntegrityError, connections, router, transaction
+from rest_framework import serializers
+
+from api.cache import invalidate_model
+from payment.ledger import record_payments
+from payment.models import PaymentHistory
+from payment.rollups import add_to_rollups
+from payment.serializers import PaymentBulkSerializer
+
+INGEST_BATCH_SIZE = 1000
+
+
+def validate_payments(items, context=None, start=0):
+    """
+    Validate raw payment items. Returns the unsaved payments and the errors
+    of the invalid items by index, counted from ``start``.
+    """
+    context = dict(context or {})
+    context.update(PaymentBulkSerializer.load_related(items))
+    serializer = PaymentBulkSerializer(context=context)
+
+    payments, errors = [], []
+    for index, item in enumerate(items, start=start):
+        try:
+            validated_data = serializer.run_validation(item)
+        except serializers.ValidationError as exc:
+            errors.append({"index": index, "errors": exc.detail})
+            continue
+        payments.append(PaymentHistory(**validated_data))
+    return payments, errors
+
+
+def _insert_postgresql(batch, connection):
+    """
+    ``INSERT ... ON CONFLICT (transaction_id) DO NOTHING RETURNING id``:
+    conflicts on any other constraint still raise.
+    """
+    opts = PaymentHistory._meta
+    qn = connection.ops.quote_name
+    fields = opts.concrete_fields
+    params = []
+    for payment in batch:
+        params += [
+            field.get_db_prep_save(field.pre_save(payment, True), connection)
+            for field in fields
+        ]
+    row = f"({', '.join(['%s'] * len(fields))})"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(opts.db_table)} "
+            f"({', '.join(qn(field.column) for field in fields)}) "
+            f"VALUES {', '.join([row] * len(batch))} "
+            f"ON CONFLICT ({qn(opts.get_field('transaction_id').column)}) "
+            f"DO NOTHING RETURNING {qn(opts.pk.column)}",
+            params,
+        )
+        return {opts.pk.to_python(pk) for (pk,) in cursor.fetchall()}
+
+
+def _insert_ignoring_conflicts(batch, using):
+    PaymentHistory.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+    # Primary keys are generated client side, so a transaction id found under
+    # the payment's own key was inserted by this call.
+    transaction_ids = {payment.transaction_id for payment in batch}
+    rows = dict(
+        PaymentHistory.objects.using(using)
+        .filter(transaction_id__in=transaction_ids)
+        .values_list("transaction_id", "pk")
+    )
+    # The rest must have lost to an existing transaction id; anything else
+    # was ignored for another constraint and must not pass as a duplicate.
+    rejected = [
+        payment.transaction_id
+        for payment in batch
+        if payment.transaction_id not in rows
+    ]
+    if rejected:
+        raise IntegrityError(f"Payments {', '.join(rejected)} could not be inserted.")
+    return {
+        payment.pk for payment in batch if rows[payment.transaction_id] == payment.pk
+    }
+
+
+def _insert_new(batch):
+    """Insert the payments of ``batch`` and return the primary keys inserted."""
+    using = router.db_for_write(PaymentHistory)
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        created = _insert_postgresql(batch, connection)
+    else:
+        created = _insert_ignoring_conflicts(batch, using)
+    for payment in batch:
+        if payment.pk in created:
+            payment._state.adding = False
+            payment._state.db = using
+    return created
+
+
+def ingest_payments(payments, batch_size=INGEST_BATCH_SIZE):
+    """
+    Insert ``payments``, skipping the transaction ids that already exist,
+    and add the new ones to the ledger and the rollups, in one transaction.
+    Returns the transaction ids that were inserted and the duplicates.
+    """
+    inserted, duplicates = [], []
+    unique, seen = [], set()
+    for payment in payments:
+        if payment.transaction_id in seen:
+            duplicates.append(payment.transaction_id)
+        else:
+            seen.add(payment.transaction_id)
+            unique.append(payment)
+
+    with transaction.atomic():
+        for start in range(0, len(unique), batch_size):
+            batch = unique[start : start + batch_size]
+            created = _insert_new(batch)
+            new = [payment for payment in batch if payment.pk in created]
+            record_payments(new)
+            add_to_rollups(new)
+
+            inserted += [payment.transaction_id for payment in new]
+            duplicates += [
+                payment.transaction_id for payment in batch if payment.pk not in created
+            ]
+        if inserted:
+            invalidate_model(PaymentHistory)
+    return inserted, duplicates
@@ -0,0 +1,276 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from payment.models import LedgerEntry, PaymentHistory, RunningBalance
+
+User = get_user_model()
+
+CENT = Decimal("0.01")
+USER_BATCH_SIZE = 1000
+# Rows per running balance upsert, well below SQLite's parameter limit.
+BALANCE_UPSERT_BATCH = 500
+
+_BALANCE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+class InsufficientBalance(Exception):
+    pass
+
+
+def to_amount(value):
+    """Exact two-decimal amount from a float, string or Decimal."""
+    return Decimal(str(value)).quantize(CENT)
+
+
+def payment_amount(payment):
+    """Signed ledger amount of a payment, None if it moves no money."""
+    if payment.status != PaymentHistory.SUCCESS:
+        return None
+    amount = to_amount(payment.amount)
+    return amount if payment.payment_type == PaymentHistory.INCOME else -amount
+
+
+def with_balances(queryset):
+    """Annotate users with ``ledger_balance``, their running balance."""
+    return queryset.annotate(
+        ledger_balance=Coalesce(
+            "running_balance__amount",
+            Value(Decimal("0.00"), output_field=_BALANCE_FIELD),
+        )
+    )
+
+
+def get_balance(user):
+    """
+    The running balance of ``user``: the sum of their ledger entries, kept
+    in step by ``append_entries()`` and ``debit()``.
+    """
+    balance = (
+        RunningBalance.objects.filter(user_id=user.pk)
+        .values_list("amount", flat=True)
+        .first()
+    )
+    return to_amount(balance or 0)
+
+
+def move_balances(deltas):
+    """
+    Add ``deltas`` (user id -> signed amount) to the running balances with
+    one ``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and SQLite.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    using = router.db_for_write(RunningBalance)
+    connection = connections[using]
+    if connection.vendor not in ("postgresql", "sqlite"):
+        _move_one_by_one(deltas, using)
+        return
+
+    opts = RunningBalance._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    user_field, amount_field = opts.get_field("user"), opts.get_field("amount")
+    user, amount = qn(user_field.column), qn(amount_field.column)
+
+    # A stable row order keeps concurrent upserts from deadlocking.
+    items = sorted(deltas.items(), key=lambda item: str(item[0]))
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), BALANCE_UPSERT_BATCH):
+            batch = items[start : start + BALANCE_UPSERT_BATCH]
+            params = []
+            for user_id, delta in batch:
+                params += [
+                    user_field.get_db_prep_save(user_id, connection),
+                    amount_field.get_db_prep_save(delta, connection),
+                ]
+            cursor.execute(
+                f"INSERT INTO {table} ({user}, {amount}) "
+                f"VALUES {', '.join(['(%s, %s)'] * len(batch))} "
+                f"ON CONFLICT ({user}) DO UPDATE SET "
+                f"{amount} = {table}.{amount} + EXCLUDED.{amount}",
+                params,
+            )
+
+
+def _move_one_by_one(deltas, using):
+    balances = RunningBalance.objects.using(using)
+    for user_id, delta in deltas.items():
+        increment = dict(amount=F("amount") + delta)
+        if balances.filter(user_id=user_id).update(**increment):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                balances.create(user_id=user_id, amount=delta)
+        except IntegrityError:
+            balances.filter(user_id=user_id).update(**increment)
+
+
+def append_entries(entries):
+    """
+    Insert ledger ``entries`` with one insert and move the running balance
+    of each user by the sum of their entries.
+    """
+    deltas = defaultdict(Decimal)
+    for entry in entries:
+        deltas[entry.user_id] += entry.amount
+    with transaction.atomic():
+        entries = LedgerEntry.objects.bulk_create(entries)
+        move_balances(deltas)
+    return entries
+
+
+def credit(user, amount, kind, **references):
+    """Append a credit of ``amount`` to the ledger of ``user``."""
+    entry = LedgerEntry(
+        user_id=user.pk, amount=to_amount(amount), kind=kind, **references
+    )
+    return append_entries([entry])[0]
+
+
+def record_payment(payment):
+    amount = payment_amount(payment)
+    if amount is None:
+        return None
+    entry = LedgerEntry(
+        user_id=payment.user_id,
+        amount=amount,
+        kind=LedgerEntry.PAYMENT,
+        payment=payment,
+    )
+    return append_entries([entry])[0]
+
+
+def record_payments(payments):
+    """Append the entries of many saved payments with one insert."""
+    entries = []
+    for payment in payments:
+        amount = payment_amount(payment)
+        if amount is not None:
+            entries.append(
+                LedgerEntry(
+                    user_id=payment.user_id,
+                    amount=amount,
+                    kind=LedgerEntry.PAYMENT,
+                    payment=payment,
+                )
+            )
+    return append_entries(entries)
+
+
+def debit(user, amount, kind, **references):
+    """
+    Append a debit of ``amount`` unless it would take the balance below
+    zero. The check and the debit are one guarded
+    ``UPDATE ... SET amount = amount - x WHERE amount >= x`` on the running
+    balance, so concurrent debits of the same user cannot both pass it and
+    nothing holds the row longer than the surrounding transaction.
+    """
+    amount = to_amount(amount)
+    with transaction.atomic(savepoint=False):
+        if amount and not RunningBalance.objects.filter(
+            user_id=user.pk, amount__gte=amount
+        ).update(amount=F("amount") - amount):
+            raise InsufficientBalance()
+        return LedgerEntry.objects.create(
+            user_id=user.pk, amount=-amount, kind=kind, **references
+        )
+
+
+def rebuild_running_balances(user_ids, dry_run=False):
+    """
+    Reset the running balances of ``user_ids`` to the sum of their whole
+    ledger. Returns ``(user id, running balance, ledger balance)`` for
+    every running balance that had drifted.
+    """
+    with transaction.atomic():
+        # Locked first, so entries whose balance change is still pending are
+        # not committed yet and are left out of the totals as well.
+        current = dict(
+            RunningBalance.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .values_list("user_id", "amount")
+        )
+        totals = dict(
+            LedgerEntry.objects.filter(user_id__in=user_ids)
+            .order_by()
+            .values_list("user_id")
+            .annotate(total=Sum("amount"))
+        )
+        drifted = []
+        for user_id in current.keys() | totals.keys():
+            running = to_amount(current.get(user_id) or 0)
+            total = to_amount(totals.get(user_id) or 0)
+            if running != total:
+                drifted.append((user_id, running, total))
+        if drifted and not dry_run:
+            RunningBalance.objects.bulk_create(
+                [
+                    RunningBalance(user_id=user_id, amount=total)
+                    for user_id, _, total in drifted
+                ],
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["amount"],
+            )
+    return drifted
+
+
+def payment_mismatches(user_ids):
+    """
+    Compare the successful ``PaymentHistory`` of ``user_ids`` with their
+    payment and adjustment entries. Returns ``(user id, expected,
+    recorded)`` for every user that differs.
+    """
+    expected = dict(
+        PaymentHistory.objects.filter(
+            user_id__in=user_ids, status=PaymentHistory.SUCCESS
+        )
+        .order_by()
+        .values_list("user_id")
+        .annotate(
+            total=Sum(
+                Case(
+                    When(payment_type=PaymentHistory.INCOME, then=F("amount")),
+                    default=-F("amount"),
+                    output_field=_BALANCE_FIELD,
+                )
+            )
+        )
+    )
+    recorded = dict(
+        LedgerEntry.objects.filter(
+            user_id__in=user_ids,
+            kind__in=[LedgerEntry.PAYMENT, LedgerEntry.ADJUSTMENT],
+        )
+        .order_by()
+        .values_list("user_id")
+        .annotate(total=Sum("amount"))
+    )
+    mismatches = []
+    for user_id in expected.keys() | recorded.keys():
+        want = to_amount(expected.get(user_id) or 0)
+        have = to_amount(recorded.get(user_id) or 0)
+        if want != have:
+            mismatches.append((user_id, want, have))
+    return mismatches
+
+
+def iter_user_batches(batch_size=USER_BATCH_SIZE):
+    """Yield lists of user ids in primary key order without loading users."""
+    last = None
+    while True:
+        queryset = User.objects.order_by("pk")
+        if last is not None:
+            queryset = queryset.filter(pk__gt=last)
+        batch = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
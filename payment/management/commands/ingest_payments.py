@@ -0,0 +1,101 @@
+import csv
+import json
+from contextlib import ExitStack
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.ingest import INGEST_BATCH_SIZE, ingest_payments, validate_payments
+
+
+def read_items(source, file_format):
+    if file_format == "csv":
+        for row in csv.DictReader(source):
+            # Empty cells are missing values, not empty strings.
+            yield {key: value for key, value in row.items() if value != ""}
+        return
+
+    for number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise CommandError(f"NDJSON parse error on line {number} - {exc}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingest a settlement batch of payments from a CSV or NDJSON file, "
+        "skipping transaction ids that already exist."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            help="Defaults to the file extension.",
+        )
+        parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+        parser.add_argument(
+            "--report",
+            help="Write the outcome of every item to this CSV file.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or (
+            "csv" if options["file"].endswith(".csv") else "ndjson"
+        )
+        batch_size = options["batch_size"]
+        totals = {"inserted": 0, "duplicate": 0, "invalid": 0}
+
+        with ExitStack() as stack:
+            report = None
+            if options["report"]:
+                report = csv.writer(
+                    stack.enter_context(
+                        open(options["report"], "w", newline="", encoding="utf-8")
+                    )
+                )
+                report.writerow(["item", "transaction_id", "result", "errors"])
+
+            source = stack.enter_context(
+                open(options["file"], newline="", encoding="utf-8")
+            )
+            items = read_items(source, file_format)
+            start = 0
+            while batch := list(islice(items, batch_size)):
+                payments, errors = validate_payments(batch, start=start)
+                inserted, duplicates = ingest_payments(payments, batch_size)
+                totals["inserted"] += len(inserted)
+                totals["duplicate"] += len(duplicates)
+                totals["invalid"] += len(errors)
+
+                if report:
+                    for error in errors:
+                        item = batch[error["index"] - start]
+                        transaction_id = (
+                            item.get("transaction_id", "")
+                            if isinstance(item, dict)
+                            else ""
+                        )
+                        report.writerow(
+                            [
+                                error["index"],
+                                transaction_id,
+                                "invalid",
+                                json.dumps(error["errors"]),
+                            ]
+                        )
+                    for transaction_id in inserted:
+                        report.writerow(["", transaction_id, "inserted", ""])
+                    for transaction_id in duplicates:
+                        report.writerow(["", transaction_id, "duplicate", ""])
+                start += len(batch)
+
+        self.stdout.write(
+            f"{totals['inserted']} inserted, {totals['duplicate']} duplicate(s), "
+            f"{totals['invalid']} invalid item(s)."
+        )
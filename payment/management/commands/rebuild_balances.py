@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+
+from payment.ledger import (
+    USER_BATCH_SIZE,
+    append_entries,
+    iter_user_batches,
+    payment_mismatches,
+    rebuild_running_balances,
+)
+from payment.models import LedgerEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify ledger payment entries against PaymentHistory and rebuild "
+        "running balances from the ledger, one batch of users at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=USER_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report differences, write nothing.",
+        )
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Append adjustment entries for users whose payments differ.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        mismatched = running = 0
+
+        for user_ids in iter_user_batches(options["batch_size"]):
+            mismatches = payment_mismatches(user_ids)
+            for user_id, expected, recorded in mismatches:
+                self.stdout.write(
+                    f"payments {user_id}: expected {expected}, ledger {recorded}"
+                )
+            if mismatches and options["repair"] and not dry_run:
+                append_entries(
+                    [
+                        LedgerEntry(
+                            user_id=user_id,
+                            amount=expected - recorded,
+                            kind=LedgerEntry.ADJUSTMENT,
+                        )
+                        for user_id, expected, recorded in mismatches
+                    ]
+                )
+            mismatched += len(mismatches)
+
+            for user_id, balance, ledger in rebuild_running_balances(
+                user_ids, dry_run=dry_run
+            ):
+                self.stdout.write(
+                    f"running balance {user_id}: running {balance}, ledger {ledger}"
+                )
+                running += 1
+
+        self.stdout.write(
+            f"{mismatched} user(s) with payment differences, "
+            f"{running} drifted running balance(s)."
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from payment.ledger import USER_BATCH_SIZE, iter_user_batches
+from payment.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the monthly payment rollups from the payment history. Run it "
+        "once after deploying the rollups and after editing payments by hand; "
+        "payments recorded for a batch while it is rebuilt may be missed, so "
+        "prefer a quiet period."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=USER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = 0
+        for user_ids in iter_user_batches(options["batch_size"]):
+            written += rebuild_rollups(user_ids)
+        self.stdout.write(f"Wrote {written} payment rollup(s).")
@@ -0,0 +1,136 @@
+import csv
+import datetime
+from contextlib import ExitStack
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from payment.reconcile import (
+    REPORT_HEADER,
+    RECONCILE_CHUNK_SIZE,
+    missing_from_statement,
+    reconcile,
+)
+
+
+def _day_start(value, option):
+    day = parse_date(value)
+    if day is None:
+        raise CommandError(f"Invalid {option} {value!r}, expected YYYY-MM-DD.")
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def _status(value, status_map):
+    value = (value or "").strip().lower()
+    return status_map.get(value, value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile PaymentHistory against a processor statement CSV and write "
+        "the missing, amount and status mismatches as a CSV report. With "
+        "--since and --until, successful payments of that period that the "
+        "statement does not list are reported as well."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("statement")
+        parser.add_argument(
+            "--report", help="Write the report to this path instead of stdout."
+        )
+        parser.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE)
+        parser.add_argument(
+            "--since", help="First day (YYYY-MM-DD) the statement covers."
+        )
+        parser.add_argument(
+            "--until", help="Last day (YYYY-MM-DD) the statement covers."
+        )
+        parser.add_argument("--id-column", default="transaction_id")
+        parser.add_argument("--amount-column", default="amount")
+        parser.add_argument(
+            "--status-column",
+            default="status",
+            help="Leave the column out of the statement to skip status checks.",
+        )
+        parser.add_argument(
+            "--status-map",
+            action="append",
+            default=[],
+            metavar="VALUE=STATUS",
+            help="Map a statement status to ours, e.g. settled=success. Repeatable.",
+        )
+
+    def handle(self, *args, **options):
+        id_column = options["id_column"]
+        amount_column = options["amount_column"]
+        status_column = options["status_column"]
+        status_map = {}
+        for item in options["status_map"]:
+            value, sep, status = item.partition("=")
+            if not sep:
+                raise CommandError(
+                    f"Invalid status map {item!r}, expected VALUE=STATUS."
+                )
+            status_map[value.strip().lower()] = status.strip()
+
+        window = None
+        if options["since"] or options["until"]:
+            if not (options["since"] and options["until"]):
+                raise CommandError("--since and --until go together.")
+            window = (
+                _day_start(options["since"], "--since"),
+                _day_start(options["until"], "--until") + datetime.timedelta(days=1),
+            )
+
+        with ExitStack() as stack:
+            statement = stack.enter_context(
+                open(options["statement"], newline="", encoding="utf-8")
+            )
+            reader = csv.DictReader(statement)
+            missing = {id_column, amount_column} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(
+                    f"Statement has no {', '.join(sorted(missing))} column."
+                )
+
+            if options["report"]:
+                output = stack.enter_context(
+                    open(options["report"], "w", newline="", encoding="utf-8")
+                )
+            else:
+                output = self.stdout
+            report = csv.writer(output)
+            report.writerow(REPORT_HEADER)
+
+            seen = set()
+
+            def rows():
+                # Line 1 is the header.
+                for line, row in enumerate(reader, start=2):
+                    if window:
+                        seen.add(row[id_column])
+                    yield (
+                        line,
+                        row[id_column],
+                        row[amount_column],
+                        _status(row.get(status_column), status_map),
+                    )
+
+            mismatches = reconcile(rows(), options["chunk_size"])
+            if window:
+                # Runs once the statement is read and ``seen`` is complete.
+                mismatches = chain(
+                    mismatches,
+                    missing_from_statement(seen, *window, options["chunk_size"]),
+                )
+            counts = {}
+            for mismatch in mismatches:
+                report.writerow(mismatch)
+                counts[mismatch[2]] = counts.get(mismatch[2], 0) + 1
+
+        summary = ", ".join(
+            f"{count} {issue}" for issue, count in sorted(counts.items())
+        )
+        self.stderr.write(f"Mismatches: {summary or 'none'}.")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_alter_paymenthistory_payment_type'),
+        ('pet', '0008_pet_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenthistory',
+            index=models.Index(fields=['user', 'created_at'], name='payment_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:32
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def import_balances(apps, schema_editor):
+    """
+    Seed the ledger: one entry per successful payment, then an opening entry
+    for whatever the old float balance held beyond them (adoption fees and
+    past drift).
+    """
+    db = schema_editor.connection.alias
+    User = apps.get_model('user', 'CustomUser')
+    PaymentHistory = apps.get_model('payment', 'PaymentHistory')
+    LedgerEntry = apps.get_model('payment', 'LedgerEntry')
+
+    totals = defaultdict(Decimal)
+    entries = []
+    payments = (
+        PaymentHistory.objects.using(db)
+        .filter(status='success')
+        .values_list('id', 'user_id', 'amount', 'payment_type', 'created_at')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    for pk, user_id, amount, payment_type, created_at in payments:
+        amount = amount if payment_type == 'income' else -amount
+        totals[user_id] += amount
+        entries.append(
+            LedgerEntry(
+                user_id=user_id,
+                amount=amount,
+                kind='payment',
+                payment_id=pk,
+                created_at=created_at,
+            )
+        )
+        if len(entries) == BATCH_SIZE:
+            LedgerEntry.objects.using(db).bulk_create(entries)
+            entries = []
+
+    now = django.utils.timezone.now()
+    users = User.objects.using(db).values_list('id', 'balance').iterator(
+        chunk_size=BATCH_SIZE
+    )
+    for user_id, balance in users:
+        opening = Decimal(str(balance)).quantize(Decimal('0.01')) - totals[user_id]
+        if opening:
+            entries.append(
+                LedgerEntry(
+                    user_id=user_id, amount=opening, kind='opening', created_at=now
+                )
+            )
+        if len(entries) == BATCH_SIZE:
+            LedgerEntry.objects.using(db).bulk_create(entries)
+            entries = []
+    LedgerEntry.objects.using(db).bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_access_path_indexes'),
+        ('pet', '0010_pet_views'),
+        ('user', '0002_alter_customuser_balance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance_snapshot', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('as_of', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('opening', 'opening'), ('payment', 'payment'), ('adoption', 'adoption'), ('adjustment', 'adjustment')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('adoption', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entry', to='pet.adoption')),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entry', to='payment.paymenthistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx')],
+            },
+        ),
+        migrations.RunPython(import_balances, migrations.RunPython.noop),
+    ]
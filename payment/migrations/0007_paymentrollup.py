@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:37
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0006_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('month', models.DateField()),
+                ('payment_type', models.CharField(choices=[('expense', 'expense'), ('income', 'income')], max_length=20)),
+                ('status', models.CharField(choices=[('failed', 'failed'), ('success', 'success'), ('blocked', 'blocked')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='payment_rollup_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'payment_type', 'status'), name='payment_rollup_unique')],
+            },
+        ),
+    ]
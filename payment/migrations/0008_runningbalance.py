@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+BATCH_SIZE = 2000
+
+
+def seed_running_balances(apps, schema_editor):
+    """Start every running balance at the sum of the user's ledger entries."""
+    db = schema_editor.connection.alias
+    LedgerEntry = apps.get_model('payment', 'LedgerEntry')
+    RunningBalance = apps.get_model('payment', 'RunningBalance')
+
+    totals = (
+        LedgerEntry.objects.using(db)
+        .order_by()
+        .values_list('user_id')
+        .annotate(total=Sum('amount'))
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    balances = []
+    for user_id, total in totals:
+        balances.append(RunningBalance(user_id=user_id, amount=total))
+        if len(balances) == BATCH_SIZE:
+            RunningBalance.objects.using(db).bulk_create(balances)
+            balances = []
+    RunningBalance.objects.using(db).bulk_create(balances)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_paymentrollup'),
+        ('user', '0003_remove_customuser_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunningBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='running_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(seed_running_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0008_runningbalance'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='BalanceSnapshot',
+        ),
+    ]
@@ -3,8 +3,8 @@ from django.db import models
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
-from pet.models import Pet
-
+from django.utils import timezone
+from pet.models import Adoption, Pet
 
 User = get_user_model()
 
@@ -52,5 +52,123 @@ class PaymentHistory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"], name="payment_user_created_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Payment {self.transaction_id} ({self.status})"
+
+
+class PaymentRollup(models.Model):
+    """
+    Payment count and total per user, month, type and status, kept up to
+    date on insert by payment/rollups.py.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="payment_rollups"
+    )
+    # First day of the month, in the project time zone.
+    month = models.DateField()
+    payment_type = models.CharField(
+        max_length=20, choices=PaymentHistory.PAYMENT_TYPE_CHOICES
+    )
+    status = models.CharField(max_length=20, choices=PaymentHistory.STATUS_CHOICES)
+
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "month", "payment_type", "status"],
+                name="payment_rollup_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month"], name="payment_rollup_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.payment_type} {self.status} ({self.user_id})"
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every balance change, in exact decimals. A user's
+    balance is the sum of their entries, see payment/ledger.py.
+    """
+
+    OPENING = "opening"
+    PAYMENT = "payment"
+    ADOPTION = "adoption"
+    ADJUSTMENT = "adjustment"
+    KIND_CHOICES = [
+        (OPENING, "opening"),
+        (PAYMENT, "payment"),
+        (ADOPTION, "adoption"),
+        (ADJUSTMENT, "adjustment"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="ledger_entries"
+    )
+    # Signed: credits are positive, debits negative.
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+
+    payment = models.OneToOneField(
+        PaymentHistory,
+        on_delete=models.SET_NULL,
+        related_name="ledger_entry",
+        blank=True,
+        null=True,
+    )
+    adoption = models.OneToOneField(
+        Adoption,
+        on_delete=models.SET_NULL,
+        related_name="ledger_entry",
+        blank=True,
+        null=True,
+    )
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="ledger_user_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} ({self.user_id})"
+
+
+class RunningBalance(models.Model):
+    """
+    Sum of all of a user's ledger entries, moved in the same transaction
+    that appends each entry. It is the balance users see and debits are a
+    single guarded ``UPDATE`` on it, see payment/ledger.py;
+    ``rebuild_balances`` checks it against the ledger.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="running_balance",
+    )
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.amount} ({self.user_id})"
@@ -1,5 +1,6 @@
-from rest_framework.pagination import PageNumberPagination
+from api.paginations import KeysetPageNumberPagination
 
 
-class PaymentHistoryPagination(PageNumberPagination):
+class PaymentHistoryPagination(KeysetPageNumberPagination):
     page_size = 10
+    keyset_ordering = ("-created_at",)
@@ -0,0 +1,89 @@
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from payment.models import PaymentHistory
+
+RECONCILE_CHUNK_SIZE = 5000
+
+MISSING = "missing"
+AMOUNT = "amount"
+STATUS = "status"
+INVALID = "invalid"
+NOT_IN_STATEMENT = "not_in_statement"
+
+REPORT_HEADER = [
+    "line",
+    "transaction_id",
+    "issue",
+    "statement_amount",
+    "recorded_amount",
+    "statement_status",
+    "recorded_status",
+]
+
+
+def reconcile(rows, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Compare statement rows, ``(line, transaction id, amount, status)``
+    tuples, with ``PaymentHistory`` and yield a report row for every
+    mismatch. Rows are matched ``chunk_size`` at a time with one
+    ``in_bulk`` lookup, so memory does not grow with the statement.
+    """
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        payments = PaymentHistory.objects.only(
+            "transaction_id", "amount", "status"
+        ).in_bulk(
+            {transaction_id for _, transaction_id, _, _ in chunk},
+            field_name="transaction_id",
+        )
+        for line, transaction_id, amount, status in chunk:
+            yield from _compare(line, transaction_id, amount, status, payments)
+
+
+def _compare(line, transaction_id, amount, status, payments):
+    try:
+        amount = Decimal(amount)
+    except (InvalidOperation, TypeError):
+        yield [line, transaction_id, INVALID, amount, "", status, ""]
+        return
+
+    payment = payments.get(transaction_id)
+    if payment is None:
+        yield [line, transaction_id, MISSING, amount, "", status, ""]
+        return
+
+    checks = (
+        (AMOUNT, amount != payment.amount),
+        (STATUS, bool(status) and status != payment.status),
+    )
+    for issue, differs in checks:
+        if differs:
+            yield [
+                line,
+                transaction_id,
+                issue,
+                amount,
+                payment.amount,
+                status,
+                payment.status,
+            ]
+
+
+def missing_from_statement(seen, since, until, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    Yield a report row for every successful payment created in
+    ``[since, until)`` whose transaction id is not in ``seen``, the ids of
+    the statement.
+    """
+    payments = (
+        PaymentHistory.objects.filter(
+            status=PaymentHistory.SUCCESS, created_at__gte=since, created_at__lt=until
+        )
+        .order_by()
+        .values_list("transaction_id", "amount", "status")
+        .iterator(chunk_size=chunk_size)
+    )
+    for transaction_id, amount, status in payments:
+        if transaction_id not in seen:
+            yield ["", transaction_id, NOT_IN_STATEMENT, "", amount, "", status]
@@ -0,0 +1,156 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from payment.ledger import to_amount
+from payment.models import PaymentHistory, PaymentRollup
+
+# Rows per upsert statement, well below SQLite's parameter limit.
+ROLLUP_UPSERT_BATCH = 500
+
+
+def rollup_month(value):
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def _group(payments):
+    deltas = defaultdict(lambda: [0, Decimal("0.00")])
+    for payment in payments:
+        key = (
+            payment.user_id,
+            rollup_month(payment.created_at),
+            payment.payment_type,
+            payment.status,
+        )
+        deltas[key][0] += 1
+        deltas[key][1] += to_amount(payment.amount)
+    return deltas
+
+
+def add_to_rollups(payments):
+    """
+    Add saved ``payments`` to their rollups with one upsert that increments
+    ``count`` and ``total`` (``ON CONFLICT ... DO UPDATE`` on PostgreSQL
+    and SQLite).
+    """
+    deltas = _group(payments)
+    if not deltas:
+        return
+
+    using = router.db_for_write(PaymentRollup)
+    connection = connections[using]
+    if connection.vendor not in ("postgresql", "sqlite"):
+        _add_one_by_one(deltas, using)
+        return
+
+    opts = PaymentRollup._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    fields = [
+        opts.get_field(name)
+        for name in ("id", "user", "month", "payment_type", "status", "count", "total")
+    ]
+    columns = [qn(field.column) for field in fields]
+    count, total = columns[5], columns[6]
+
+    row = f"({', '.join(['%s'] * len(fields))})"
+    # A stable row order keeps concurrent inserts from deadlocking.
+    items = sorted(deltas.items(), key=_sort_key)
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), ROLLUP_UPSERT_BATCH):
+            batch = items[start : start + ROLLUP_UPSERT_BATCH]
+            params = []
+            for key, (delta_count, delta_total) in batch:
+                values = (opts.pk.get_default(), *key, delta_count, delta_total)
+                params += [
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, values)
+                ]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES {', '.join([row] * len(batch))} "
+                f"ON CONFLICT ({', '.join(columns[1:5])}) DO UPDATE SET "
+                f"{count} = {table}.{count} + EXCLUDED.{count}, "
+                f"{total} = {table}.{total} + EXCLUDED.{total}",
+                params,
+            )
+
+
+def _sort_key(item):
+    user_id, month, payment_type, status = item[0]
+    return str(user_id), month, payment_type, status
+
+
+def _add_one_by_one(deltas, using):
+    rollups = PaymentRollup.objects.using(using)
+    for (user_id, month, payment_type, status), (count, total) in deltas.items():
+        key = dict(
+            user_id=user_id, month=month, payment_type=payment_type, status=status
+        )
+        increment = dict(count=F("count") + count, total=F("total") + total)
+        if rollups.filter(**key).update(**increment):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                rollups.create(**key, count=count, total=total)
+        except IntegrityError:
+            rollups.filter(**key).update(**increment)
+
+
+def rebuild_rollups(user_ids):
+    """Recompute the rollups of ``user_ids`` from ``PaymentHistory``."""
+    rows = (
+        PaymentHistory.objects.filter(user_id__in=user_ids)
+        .annotate(month=TruncMonth("created_at"))
+        .order_by()
+        .values("user_id", "month", "payment_type", "status")
+        .annotate(payment_count=Count("pk"), payment_total=Sum("amount"))
+    )
+    with transaction.atomic():
+        PaymentRollup.objects.filter(user_id__in=user_ids).delete()
+        return len(
+            PaymentRollup.objects.bulk_create(
+                PaymentRollup(
+                    user_id=row["user_id"],
+                    month=timezone.localtime(row["month"]).date(),
+                    payment_type=row["payment_type"],
+                    status=row["status"],
+                    count=row["payment_count"],
+                    total=to_amount(row["payment_total"]),
+                )
+                for row in rows
+            )
+        )
+
+
+def summarize(rollups):
+    """
+    Sum ``rollups`` per month, type and status and per type and status.
+    Only reads the rollup table, however many payments it covers.
+    """
+    rows = rollups.order_by().values("payment_type", "status")
+    sums = dict(rollup_count=Sum("count"), rollup_total=Sum("total"))
+
+    def represent(row):
+        return {
+            **row,
+            "count": row.pop("rollup_count"),
+            "total": to_amount(row.pop("rollup_total")),
+        }
+
+    return {
+        "results": [
+            represent(row)
+            for row in rows.values("month", "payment_type", "status")
+            .annotate(**sums)
+            .order_by("-month", "payment_type", "status")
+        ],
+        "totals": [
+            represent(row)
+            for row in rows.annotate(**sums).order_by("payment_type", "status")
+        ],
+    }
@@ -1,5 +1,12 @@
 from rest_framework import serializers
 
+from api.serializers import (
+    PreloadedRelatedField,
+    SparseFieldsetMixin,
+    preload_related,
+)
+from django.contrib.auth import get_user_model
+
 from pet.models import Pet
 from .models import PaymentHistory
 
@@ -19,7 +26,7 @@ class PetSerializer(serializers.ModelSerializer):
         ]
 
 
-class PaymentHistorySerializer(serializers.ModelSerializer):
+class PaymentHistorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     pet_details = PetSerializer(source="pet", read_only=True)
     pet = serializers.PrimaryKeyRelatedField(
         queryset=Pet.objects.filter(status=Pet.APPROVED),
@@ -50,3 +57,63 @@ class PaymentHistorySerializer(serializers.ModelSerializer):
 class PaymentAdminHistorySerializer(PaymentHistorySerializer):
     class Meta(PaymentHistorySerializer.Meta):
         fields = PaymentHistorySerializer.Meta.fields + ["user"]
+
+
+class PaymentBulkSerializer(PaymentAdminHistorySerializer):
+    pet = PreloadedRelatedField(
+        "pets",
+        queryset=Pet.objects.filter(status=Pet.APPROVED),
+        required=False,
+        write_only=True,
+    )
+    user = PreloadedRelatedField("users", queryset=get_user_model().objects.all())
+
+    class Meta(PaymentAdminHistorySerializer.Meta):
+        # Duplicate transaction ids are skipped at insert time instead of
+        # being checked with a query per item.
+        extra_kwargs = {"transaction_id": {"validators": []}}
+
+    @classmethod
+    def load_related(cls, items):
+        fields = cls._declared_fields
+        return {
+            "pets": preload_related(items, "pet", fields["pet"].get_queryset()),
+            "users": preload_related(items, "user", fields["user"].get_queryset()),
+        }
+
+
+class PaymentSummaryQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(
+        input_formats=["%Y-%m"], required=False, help_text="First month, YYYY-MM."
+    )
+    end = serializers.DateField(
+        input_formats=["%Y-%m"], required=False, help_text="Last month, YYYY-MM."
+    )
+    user = serializers.UUIDField(
+        required=False, help_text="Admins only: summarize a single user."
+    )
+
+    def validate(self, attrs):
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end.")
+        return attrs
+
+
+class PaymentSummaryTotalSerializer(serializers.Serializer):
+    payment_type = serializers.CharField()
+    status = serializers.CharField()
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class PaymentSummaryMonthSerializer(serializers.Serializer):
+    month = serializers.DateField(format="%Y-%m")
+    payment_type = serializers.CharField()
+    status = serializers.CharField()
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class PaymentSummarySerializer(serializers.Serializer):
+    results = PaymentSummaryMonthSerializer(many=True)
+    totals = PaymentSummaryTotalSerializer(many=True)
@@ -1,24 +1,21 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
+from api.cache import invalidate_model
+from payment.ledger import record_payment
 from payment.models import PaymentHistory
-from pet.models import Adoption, Pet
-from django.contrib.auth import get_user_model
-
-from user.models import CustomUser
-
-User = get_user_model()
+from payment.rollups import add_to_rollups
 
 
 @receiver(post_save, sender=PaymentHistory)
 def update_user_balance(sender, instance, created, **kwargs):
+    # Appends to the ledger instead of saving the user row, see
+    # payment/ledger.py.
     if created:
-        payment_type = instance.payment_type
-        user = instance.user
-        if instance.status != PaymentHistory.SUCCESS:
-            return
-        if payment_type == PaymentHistory.INCOME:
-            user.balance += float(instance.amount)
-        else:
-            user.balance -= float(instance.amount)
+        record_payment(instance)
+        add_to_rollups([instance])
 
-        user.save(update_fields=["balance"])
+
+@receiver(post_save, sender=PaymentHistory)
+@receiver(post_delete, sender=PaymentHistory)
+def invalidate_payments(sender, **kwargs):
+    invalidate_model(PaymentHistory)
@@ -1,3 +1,187 @@
+import csv
+import os
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-# Create your tests here.
+from payment.ledger import (
+    InsufficientBalance,
+    credit,
+    debit,
+    get_balance,
+    with_balances,
+)
+from payment.ingest import ingest_payments, validate_payments
+from payment.models import LedgerEntry, PaymentHistory, RunningBalance
+
+User = get_user_model()
+
+
+class BalanceTests(TestCase):
+    """Balances are read from the running balance the debits are checked on."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        cls.other = User.objects.create(username="other", email="other@example.com")
+
+    def test_credit_and_debit(self):
+        credit(self.user, "100.10", LedgerEntry.OPENING)
+        debit(self.user, 40, LedgerEntry.ADOPTION)
+        self.assertEqual(get_balance(self.user), Decimal("60.10"))
+        self.assertEqual(self.user.balance, Decimal("60.10"))
+        self.assertEqual(
+            sum(self.user.ledger_entries.values_list("amount", flat=True)),
+            Decimal("60.10"),
+        )
+
+    def test_debit_beyond_the_balance_is_refused(self):
+        credit(self.user, 10, LedgerEntry.OPENING)
+        with self.assertRaises(InsufficientBalance), transaction.atomic():
+            debit(self.user, "10.01", LedgerEntry.ADOPTION)
+        self.assertEqual(get_balance(self.user), 10)
+        self.assertEqual(self.user.ledger_entries.count(), 1)
+
+    def test_user_without_entries(self):
+        self.assertEqual(get_balance(self.user), 0)
+        with self.assertRaises(InsufficientBalance), transaction.atomic():
+            debit(self.user, 1, LedgerEntry.ADOPTION)
+
+    def test_with_balances(self):
+        credit(self.user, 25, LedgerEntry.OPENING)
+        with self.assertNumQueries(1):
+            balances = {
+                user.pk: user.balance
+                for user in with_balances(User.objects.order_by("pk"))
+            }
+        self.assertEqual(balances, {self.user.pk: 25, self.other.pk: 0})
+
+    def test_rebuild_balances_repairs_drift(self):
+        credit(self.user, 25, LedgerEntry.OPENING)
+        RunningBalance.objects.filter(user=self.user).update(amount=30)
+
+        out = StringIO()
+        call_command("rebuild_balances", "--dry-run", stdout=out)
+        self.assertIn(f"running balance {self.user.pk}: running 30.00", out.getvalue())
+        self.assertEqual(get_balance(self.user), 30)
+
+        call_command("rebuild_balances", stdout=StringIO())
+        self.assertEqual(get_balance(self.user), 25)
+
+
+class IngestPaymentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        PaymentHistory.objects.create(
+            transaction_id="tx-old", amount=5, payment_method="card", user=cls.user
+        )
+
+    def payments(self, *transaction_ids):
+        payments, errors = validate_payments(
+            [
+                {
+                    "transaction_id": transaction_id,
+                    "amount": "10.00",
+                    "payment_method": "card",
+                    "user": self.user.pk,
+                }
+                for transaction_id in transaction_ids
+            ]
+        )
+        self.assertEqual(errors, [])
+        return payments
+
+    def test_duplicates(self):
+        inserted, duplicates = ingest_payments(
+            self.payments("tx1", "tx-old", "tx2", "tx1"), batch_size=2
+        )
+        self.assertEqual(inserted, ["tx1", "tx2"])
+        self.assertEqual(sorted(duplicates), ["tx-old", "tx1"])
+        self.assertEqual(PaymentHistory.objects.count(), 3)
+        self.assertEqual(
+            LedgerEntry.objects.filter(payment__transaction_id__in=inserted).count(), 2
+        )
+        # 5 from tx-old.
+        self.assertEqual(get_balance(self.user), 25)
+
+    def test_other_conflicts_are_not_duplicates(self):
+        (payment,) = self.payments("tx1")
+        payment.pk = PaymentHistory.objects.get().pk
+        with self.assertRaises(IntegrityError):
+            ingest_payments([payment])
+        self.assertFalse(PaymentHistory.objects.filter(transaction_id="tx1").exists())
+
+
+class ReconcilePaymentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username="user", email="user@example.com")
+        for transaction_id, amount, status, day in [
+            ("tx1", 10, PaymentHistory.SUCCESS, 1),
+            ("tx2", 20, PaymentHistory.SUCCESS, 2),
+            ("tx3", 30, PaymentHistory.FAILED, 2),
+            ("tx4", 40, PaymentHistory.SUCCESS, 3),
+            ("tx5", 50, PaymentHistory.SUCCESS, 9),
+        ]:
+            payment = PaymentHistory.objects.create(
+                transaction_id=transaction_id,
+                amount=amount,
+                payment_method="card",
+                user=user,
+                status=status,
+            )
+            PaymentHistory.objects.filter(pk=payment.pk).update(
+                created_at=datetime(2026, 3, day, 12, tzinfo=timezone.utc)
+            )
+
+    def reconcile(self, rows, *args):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as statement:
+            writer = csv.writer(statement)
+            writer.writerow(["transaction_id", "amount", "status"])
+            writer.writerows(rows)
+        out, err = StringIO(), StringIO()
+        call_command("reconcile_payments", path, *args, stdout=out, stderr=err)
+        report = list(csv.DictReader(StringIO(out.getvalue())))
+        return [(row["transaction_id"], row["issue"]) for row in report], err.getvalue()
+
+    def test_statement_mismatches(self):
+        report, summary = self.reconcile(
+            [
+                ["tx1", "10.00", "success"],
+                ["tx2", "25.00", "success"],
+                ["tx3", "30.00", "success"],
+                ["tx9", "5.00", "success"],
+                ["tx4", "oops", "success"],
+            ]
+        )
+        self.assertEqual(
+            report,
+            [
+                ("tx2", "amount"),
+                ("tx3", "status"),
+                ("tx9", "missing"),
+                ("tx4", "invalid"),
+            ],
+        )
+        self.assertIn("1 amount, 1 invalid, 1 missing, 1 status", summary)
+
+    def test_payments_missing_from_the_statement(self):
+        report, summary = self.reconcile(
+            [["tx1", "10.00", "success"]],
+            "--since=2026-03-01",
+            "--until=2026-03-03",
+        )
+        # tx3 failed and tx5 is outside the statement period.
+        self.assertEqual(
+            sorted(report), [("tx2", "not_in_statement"), ("tx4", "not_in_statement")]
+        )
+        self.assertIn("2 not_in_statement", summary)
@@ -1,16 +1,35 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from api.mixins import ConditionalGetMixin, IdempotentCreateMixin, ValuesListMixin
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from api.parsers import NDJSONParser
 from payment.fitlers import PaymentHistoryFilter
+from payment.ingest import ingest_payments, validate_payments
 from payment.paginations import PaymentHistoryPagination
 from payment.permissions import IsOwnerOrAdmin
-from .models import PaymentHistory
-from .serializers import PaymentAdminHistorySerializer, PaymentHistorySerializer
+from payment.rollups import summarize
+from category.models import Category
+from pet.models import Pet
+from .models import PaymentHistory, PaymentRollup
+from .serializers import (
+    PaymentAdminHistorySerializer,
+    PaymentBulkSerializer,
+    PaymentHistorySerializer,
+    PaymentSummaryQuerySerializer,
+    PaymentSummarySerializer,
+)
 from drf_yasg.utils import swagger_auto_schema
 
 
-class PaymentHistoryViewSet(viewsets.ModelViewSet):
+class PaymentHistoryViewSet(
+    ConditionalGetMixin, IdempotentCreateMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     swagger_tags = ["payments"]
+    # Pet names and categories are nested in every payment.
+    etag_models = (PaymentHistory, Pet, Category)
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
 
     http_method_names = ["get", "post", "head", "options"]
@@ -19,6 +38,8 @@ class PaymentHistoryViewSet(viewsets.ModelViewSet):
     filterset_class = PaymentHistoryFilter
     search_fields = ["pet__name"]
     ordering_fields = ["amount", "created_at"]
+    values_actions = ["list"]
+    bulk_max_items = 10000
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -51,7 +72,9 @@ class PaymentHistoryViewSet(viewsets.ModelViewSet):
         operation_description=(
             "Add a new payment history entry. "
             "The authenticated user will automatically be assigned as the owner. "
-            "Accessible by all authenticated users."
+            "Accessible by all authenticated users.\n\n"
+            "- Send an `Idempotency-Key` header to make retries safe: the first "
+            "successful response is stored for 24 hours and replayed for the same key."
         ),
     )
     def create(self, request, *args, **kwargs):
@@ -67,3 +90,78 @@ class PaymentHistoryViewSet(viewsets.ModelViewSet):
     )
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_summary="Bulk ingest payments",
+        operation_description=(
+            "Insert a settlement batch of payments in one request.\n\n"
+            "- Only admins can ingest payments; each item names its `user`.\n"
+            "- Accepts a JSON array or an NDJSON body (`application/x-ndjson`).\n"
+            "- Payments whose `transaction_id` already exists are skipped and "
+            "reported as duplicates, invalid items are reported by their index.\n"
+            "- Balances are updated with one ledger insert for the whole batch."
+        ),
+        request_body=PaymentBulkSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        parser_classes=[JSONParser, NDJSONParser],
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def bulk(self, request, pk=None):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"details": "Expected a JSON array or NDJSON body."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {"details": f"At most {self.bulk_max_items} payments per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        payments, errors = validate_payments(items, self.get_serializer_context())
+        inserted, duplicates = ingest_payments(payments)
+        return Response(
+            {"inserted": inserted, "duplicates": duplicates, "errors": errors},
+            status=(
+                status.HTTP_201_CREATED
+                if payments or not errors
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Payment summary",
+        operation_description=(
+            "Payment counts and totals per month, type and status, plus totals "
+            "per type and status over the selected months.\n\n"
+            "- **Admins**: Summarize all users, or one user with `user`.\n"
+            "- **Regular Users**: Summarize their own payments.\n"
+            "- `start` and `end` (YYYY-MM) limit the months included.\n"
+            "- Served from monthly rollups maintained as payments are recorded."
+        ),
+        query_serializer=PaymentSummaryQuerySerializer,
+        responses={200: PaymentSummarySerializer},
+    )
+    @action(detail=False, methods=["get"])
+    def summary(self, request, pk=None):
+        query = PaymentSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        rollups = PaymentRollup.objects.all()
+        if not request.user.is_staff:
+            rollups = rollups.filter(user=request.user)
+        elif "user" in params:
+            rollups = rollups.filter(user_id=params["user"])
+        if "start" in params:
+            rollups = rollups.filter(month__gte=params["start"])
+        if "end" in params:
+            rollups = rollups.filter(month__lte=params["end"])
+
+        serializer = PaymentSummarySerializer(summarize(rollups))
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 # admin.py
 from django.contrib import admin
-from .models import Pet, Adoption
+from .models import Pet, Adoption, PetStatus
+from .moderation import transition_pets
 
 
 @admin.register(Pet)
@@ -22,6 +23,23 @@ class PetAdmin(admin.ModelAdmin):
     ordering = ("-created_at",)
     readonly_fields = ("id", "created_at", "updated_at")
     autocomplete_fields = ("category", "owner", "adopted_by")
+    actions = ("approve_pets", "suspend_pets", "withdraw_pets")
+
+    def _transition(self, request, queryset, status):
+        updated = transition_pets(queryset, status)
+        self.message_user(request, f"{updated} pet(s) marked as {status}.")
+
+    @admin.action(description="Approve selected pets")
+    def approve_pets(self, request, queryset):
+        self._transition(request, queryset, PetStatus.APPROVED)
+
+    @admin.action(description="Suspend selected pets")
+    def suspend_pets(self, request, queryset):
+        self._transition(request, queryset, PetStatus.SUSPENDED)
+
+    @admin.action(description="Withdraw selected pets")
+    def withdraw_pets(self, request, queryset):
+        self._transition(request, queryset, PetStatus.WITHDRAWN)
 
 
 @admin.register(Adoption)
@@ -0,0 +1,100 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from payment.ledger import InsufficientBalance, debit
+from payment.models import LedgerEntry
+from pet.models import Adoption, Pet
+
+
+def _supports_update_returning(connection):
+    if connection.vendor == "postgresql":
+        return True
+    # SQLite got RETURNING together with INSERT ... RETURNING (3.35).
+    return (
+        connection.vendor == "sqlite"
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+def claim_pet(pet_id, user, using):
+    """
+    Mark the pet adopted by ``user`` unless it already is, in one
+    conditional ``UPDATE ... RETURNING fees``. Returns the fees, or None
+    when the pet is missing or already adopted.
+    """
+    connection = connections[using]
+    now = timezone.now()
+
+    if not _supports_update_returning(connection):
+        fees = (
+            Pet.objects.using(using)
+            .select_for_update()
+            .filter(pk=pet_id)
+            .exclude(status=Pet.ADOPTED)
+            .values_list("fees", flat=True)
+            .first()
+        )
+        if fees is not None:
+            Pet.objects.using(using).filter(pk=pet_id).update(
+                status=Pet.ADOPTED, adopted_by=user, updated_at=now
+            )
+        return fees
+
+    fields = {
+        name: Pet._meta.get_field(name)
+        for name in ("id", "status", "adopted_by", "updated_at", "fees")
+    }
+    qn = connection.ops.quote_name
+    columns = {name: qn(field.column) for name, field in fields.items()}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {qn(Pet._meta.db_table)} "
+            f"SET {columns['status']} = %s, {columns['adopted_by']} = %s, "
+            f"{columns['updated_at']} = %s "
+            f"WHERE {columns['id']} = %s AND {columns['status']} <> %s "
+            f"RETURNING {columns['fees']}",
+            [
+                Pet.ADOPTED,
+                fields["adopted_by"].get_db_prep_value(user.pk, connection),
+                fields["updated_at"].get_db_prep_value(now, connection),
+                fields["id"].get_db_prep_value(pet_id, connection),
+                Pet.ADOPTED,
+            ],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def adopt_pet(pet_id, user):
+    """
+    Adopt a pet for ``user`` in one short transaction: claim the pet with a
+    conditional update, record the ``Adoption`` and debit its fees from the
+    ledger, which refuses to go below zero. Concurrent adopters of the same
+    pet cannot both succeed and balances never go negative.
+    """
+    try:
+        pet_id = Pet._meta.pk.to_python(pet_id)
+    except DjangoValidationError:
+        raise ValidationError("Pet not found.")
+
+    using = router.db_for_write(Adoption)
+    with transaction.atomic(using=using):
+        fees = claim_pet(pet_id, user, using)
+        if fees is None:
+            if not Pet.objects.using(using).filter(pk=pet_id).exists():
+                raise ValidationError("Pet not found.")
+            raise ValidationError("This pet is already adopted!")
+
+        adoption = Adoption(pet_id=pet_id, adopted_by=user)
+        # The pet is already marked adopted, see pet.signals.
+        adoption.pet_claimed = True
+        adoption.save(using=using)
+
+        try:
+            debit(user, fees, LedgerEntry.ADOPTION, adoption=adoption)
+        except InsufficientBalance:
+            # Rolls the claim and the adoption back as well.
+            raise ValidationError("Insufficient balance")
+    return adoption
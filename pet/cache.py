@@ -0,0 +1,105 @@
+import hashlib
+import time
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.cache import bump_version, get_version, model_version_key
+from category.models import Category
+from pet.models import Pet
+
+CATALOG_VERSION_KEY = "pet:catalog:version"
+# Bumped by new and deleted reviews, which only change the review counters
+# of pet lists and of the reviewed pet.
+REVIEWS_VERSION_KEY = "pet:reviews:version"
+CATALOG_CACHE_TIMEOUT = 60 * 5
+
+# Stampede protection: one worker rebuilds a missing key while the others
+# poll for its result instead of all hitting the database at once.
+REBUILD_LOCK_TIMEOUT = 10
+REBUILD_WAIT_INTERVAL = 0.05
+REBUILD_WAIT_ATTEMPTS = 40
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+    # Pets and categories are nested in the ETags of other endpoints.
+    for model in (Pet, Category):
+        bump_version(model_version_key(model))
+
+
+def invalidate_catalog():
+    """Bump the catalog version once the current transaction commits."""
+    transaction.on_commit(bump_catalog_version)
+
+
+def pet_version_key(pk):
+    try:
+        pk = uuid.UUID(str(pk))
+    except ValueError:
+        pass
+    return f"pet:{pk}:version"
+
+
+def bump_pet_reviews(pet_ids):
+    for pet_id in pet_ids:
+        bump_version(pet_version_key(pet_id))
+    bump_version(REVIEWS_VERSION_KEY)
+
+
+def invalidate_pet_reviews(*pet_ids):
+    """
+    Refresh the pet lists and the details of ``pet_ids``, but nothing else
+    of the catalog, once the current transaction commits.
+    """
+    transaction.on_commit(partial(bump_pet_reviews, pet_ids))
+
+
+def get_cache_key(request, prefix):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f"{request.build_absolute_uri(request.path)}?{query}"
+    digest = hashlib.sha1(url.encode()).hexdigest()
+    return f"pet:catalog:{get_catalog_version()}:{prefix}:{digest}"
+
+
+def cached_response(request, prefix, build_response):
+    """
+    Return the cached data for this request under the current catalog
+    version, calling ``build_response`` on a miss. Only ``200`` responses
+    are stored.
+    """
+    key = get_cache_key(request, prefix)
+    data = cache.get(key)
+    if data is not None:
+        return Response(data, status=status.HTTP_200_OK)
+
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT)
+    if not locked:
+        for _ in range(REBUILD_WAIT_ATTEMPTS):
+            time.sleep(REBUILD_WAIT_INTERVAL)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+            if cache.get(lock_key) is None:
+                # Rebuilt without a cacheable result (e.g. a 404).
+                break
+        # Otherwise the rebuilding worker is too slow or died, so build it here.
+
+    try:
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=CATALOG_CACHE_TIMEOUT)
+        return response
+    finally:
+        if locked:
+            cache.delete(lock_key)
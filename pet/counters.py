@@ -0,0 +1,169 @@
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import F
+
+from api.cache import bump_version, get_version
+from pet.models import Pet
+
+logger = logging.getLogger(__name__)
+
+VIEWS_VERSION_KEY = "pet:views:version"
+# Pending views are written at most this many seconds after the first of them
+# was recorded (PET_VIEW_FLUSH_INTERVAL overrides it, 0 writes every view
+# straight away) or once this many pets have pending views.
+VIEW_FLUSH_INTERVAL = 30
+VIEW_FLUSH_MAX_PETS = 1000
+
+
+def get_flush_interval():
+    return getattr(settings, "PET_VIEW_FLUSH_INTERVAL", VIEW_FLUSH_INTERVAL)
+
+
+def get_views_version():
+    return get_version(VIEWS_VERSION_KEY)
+
+
+def bump_views_version():
+    bump_version(VIEWS_VERSION_KEY)
+
+
+def write_pet_views(counts, using=None):
+    """
+    Add ``counts`` (pet id -> views) to ``Pet.views``: one
+    ``UPDATE ... FROM (VALUES ...)`` on PostgreSQL, one ``F()`` update per
+    distinct increment elsewhere.
+    """
+    using = using or router.db_for_write(Pet)
+    connection = connections[using]
+    # A stable row order keeps concurrent flushes from deadlocking.
+    items = sorted(counts.items())
+
+    if connection.vendor == "postgresql":
+        qn = connection.ops.quote_name
+        table = qn(Pet._meta.db_table)
+        views = qn(Pet._meta.get_field("views").column)
+        pk = qn(Pet._meta.pk.column)
+        values = ", ".join(["(%s::uuid, %s)"] * len(items))
+        params = [value for pk_value, count in items for value in (pk_value, count)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {views} = {table}.{views} + v.n "
+                f"FROM (VALUES {values}) AS v(id, n) WHERE {table}.{pk} = v.id",
+                params,
+            )
+        return
+
+    by_increment = defaultdict(list)
+    for pk_value, count in items:
+        by_increment[count].append(pk_value)
+    with transaction.atomic(using=using):
+        for count, pks in by_increment.items():
+            Pet.objects.using(using).filter(pk__in=pks).update(views=F("views") + count)
+
+
+class PetViewCounter:
+    """
+    Process-local buffer of pet views.
+
+    Recording a view only bumps an in-memory counter. Pending views are
+    written in one batch by ``flush()``, so popular pets are not locked on
+    every request. The first pending view starts a timer thread that flushes
+    them after the flush interval, and the rest are flushed at exit. Views
+    still buffered when a process is killed are lost.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.timer = None
+        self.flushed_at = time.monotonic()
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flushed_views = 0
+        self.last_flush_seconds = None
+        self.total_flush_seconds = 0.0
+
+    def record(self, pk):
+        interval = get_flush_interval()
+        with self.lock:
+            self.pending[uuid.UUID(str(pk))] += 1
+            due = interval <= 0 or len(self.pending) >= VIEW_FLUSH_MAX_PETS
+            if not due and self.timer is None:
+                self.timer = threading.Timer(interval, self._flush_on_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread is gone after this; don't leak its connection.
+            connections.close_all()
+
+    def _take_pending(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            return pending
+
+    def reset(self):
+        """Drop the pending views without writing them."""
+        self._take_pending()
+
+    def flush(self):
+        """Write the pending views and return how many pets were updated."""
+        pending = self._take_pending()
+        with self.lock:
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            write_pet_views(pending)
+        except DatabaseError:
+            logger.exception("Failed to flush views of %d pets", len(pending))
+            with self.lock:
+                # Keep them for the next flush, at exit at the latest.
+                self.pending.update(pending)
+                self.failed_flushes += 1
+            return 0
+        elapsed = time.perf_counter() - started
+
+        with self.lock:
+            self.flushes += 1
+            self.flushed_views += sum(pending.values())
+            self.last_flush_seconds = elapsed
+            self.total_flush_seconds += elapsed
+        bump_views_version()
+        return len(pending)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending_pets": len(self.pending),
+                "pending_views": sum(self.pending.values()),
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "flushed_views": self.flushed_views,
+                "last_flush_seconds": self.last_flush_seconds,
+                "average_flush_seconds": (
+                    self.total_flush_seconds / self.flushes if self.flushes else None
+                ),
+                "seconds_since_flush": time.monotonic() - self.flushed_at,
+            }
+
+
+pet_view_counter = PetViewCounter()
+atexit.register(pet_view_counter.flush)
@@ -0,0 +1,120 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Case, CharField, F, Value, When
+
+# (label, upper bound exclusive); the last band is open ended.
+FEE_BANDS = (
+    ("0-50", 50),
+    ("50-100", 100),
+    ("100-200", 200),
+    ("200+", None),
+)
+AGE_BANDS = (
+    ("0-1", 1),
+    ("1-3", 3),
+    ("3-8", 8),
+    ("8+", None),
+)
+
+# facet name -> column of the faceted subquery
+FACETS = {
+    "category": "facet_category",
+    "breed": "breed",
+    "fees": "facet_fees",
+    "age": "facet_age",
+}
+
+
+def _band(field, bands):
+    whens = [
+        When(**{f"{field}__lt": upper}, then=Value(label))
+        for label, upper in bands[:-1]
+    ]
+    return Case(*whens, default=Value(bands[-1][0]), output_field=CharField())
+
+
+def grouping_masks():
+    """
+    ``GROUPING()`` value of each facet's rows -> facet name. ``GROUPING()``
+    sets a bit for every column that is not grouped, the lowest bit being
+    the last column.
+    """
+    size = len(FACETS)
+    return {
+        (2**size - 1) ^ (1 << (size - 1 - index)): name
+        for index, name in enumerate(FACETS)
+    }
+
+
+def pet_facet_counts(queryset):
+    """
+    Count the pets of ``queryset`` per category, breed, fee band and age band
+    in a single query: ``GROUPING SETS`` on PostgreSQL and ``UNION ALL`` of
+    grouped subqueries elsewhere.
+    """
+    faceted = (
+        queryset.order_by()
+        .annotate(
+            facet_category=F("category__name"),
+            facet_fees=_band("fees", FEE_BANDS),
+            facet_age=_band("age", AGE_BANDS),
+        )
+        .values(*FACETS.values())
+    )
+    try:
+        sql, params = faceted.query.sql_with_params()
+    except EmptyResultSet:
+        # .none() or an empty __in: nothing to count.
+        return _format([])
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    columns = list(FACETS.values())
+
+    if connection.vendor == "postgresql":
+        masks = grouping_masks()
+        quoted = ", ".join(qn(column) for column in columns)
+        grouping_sets = ", ".join(f"({qn(column)})" for column in columns)
+        query = (
+            f"SELECT GROUPING({quoted}), {quoted}, COUNT(*) "
+            f"FROM ({sql}) facets GROUP BY GROUPING SETS ({grouping_sets})"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = [
+                (masks[mask], values[columns.index(FACETS[masks[mask]])], count)
+                for mask, *values, count in cursor.fetchall()
+            ]
+    else:
+        query = " UNION ALL ".join(
+            f"SELECT %s, {qn(column)}, COUNT(*) FROM ({sql}) facets "
+            f"GROUP BY {qn(column)}"
+            for column in columns
+        )
+        query_params = []
+        for name in FACETS:
+            query_params += [name, *params]
+        with connection.cursor() as cursor:
+            cursor.execute(query, query_params)
+            rows = cursor.fetchall()
+
+    return _format(rows)
+
+
+def _format(rows):
+    counts = {name: {} for name in FACETS}
+    for name, value, count in rows:
+        counts[name][value] = count
+
+    result = {}
+    for name in ("category", "breed"):
+        result[name] = [
+            {"value": value, "count": count}
+            for value, count in sorted(
+                counts[name].items(), key=lambda item: (-item[1], item[0] or "")
+            )
+        ]
+    for name, bands in (("fees", FEE_BANDS), ("age", AGE_BANDS)):
+        result[name] = [
+            {"value": label, "count": counts[name].get(label, 0)} for label, _ in bands
+        ]
+    return result
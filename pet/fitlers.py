@@ -1,5 +1,9 @@
 from django_filters.rest_framework import FilterSet
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
 from pet.models import Pet, Adoption
+from pet.search import PET_SEARCH_CONFIG, supports_search
 from django_filters import rest_framework as dj_filters
 
 
@@ -23,3 +27,30 @@ class AdoptionHistoryFilter(dj_filters.FilterSet):
     class Meta:
         model = Adoption
         fields = ["adopted_by", "date_after", "date_before"]
+
+
+class PetSearchFilter(SearchFilter):
+    """
+    Full-text search on the GIN indexed ``Pet.search_vector`` column, with a
+    trigram match on ``name`` to tolerate typos. Results are ranked by
+    relevance unless an explicit ``?ordering=`` is given. Falls back to the
+    plain ``SearchFilter`` on databases other than PostgreSQL.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not supports_search(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        terms = " ".join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, search_type="websearch", config=PET_SEARCH_CONFIG)
+        return (
+            queryset.filter(Q(search_vector=query) | Q(name__trigram_similar=terms))
+            .annotate(
+                search_rank=SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("name", terms)
+            )
+            .order_by("-search_rank")
+        )
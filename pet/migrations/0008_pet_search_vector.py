@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import CharField, Value
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    Pet = apps.get_model('pet', 'Pet')
+    Category = apps.get_model('category', 'Category')
+
+    def vector(category_name):
+        return (
+            SearchVector('name', weight='A', config='english')
+            + SearchVector(Value(category_name, output_field=CharField()), weight='B', config='english')
+            + SearchVector('breed', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        )
+
+    for category_id, name in Category.objects.values_list('id', 'name'):
+        Pet.objects.filter(category_id=category_id).update(search_vector=vector(name))
+    Pet.objects.filter(category__isnull=True).update(search_vector=vector(''))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+        ('pet', '0007_pet_age_pet_breed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='pet',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='pet_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='pet_name_trgm_gin', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
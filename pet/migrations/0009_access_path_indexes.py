@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+        ('pet', '0008_pet_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adoption',
+            index=models.Index(fields=['pet', 'date'], name='adoption_pet_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('status', 'approved'), ('visibility', 'public')), fields=['updated_at', 'id'], name='pet_public_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('status', 'approved'), ('visibility', 'public')), fields=['fees', 'id'], name='pet_public_fees_idx'),
+        ),
+    ]
@@ -3,9 +3,12 @@ from pickle import TRUE
 from pyexpat import model
 import uuid
 from django.conf import settings
-from django.db import models
+from django.db import models, router
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from category.models import Category
 from django.contrib.auth import get_user_model
+from pet.search import PET_SEARCH_FIELDS, pet_document_vector, supports_search
 
 User = get_user_model()
 
@@ -73,12 +76,89 @@ class Pet(models.Model):
         blank=True,
     )
 
+    # Weighted tsvector over name, breed, category name and description,
+    # written by save() and, for category changes, by pet/signals.py.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Popularity signal, written in batches by pet/counters.py.
+    views = models.PositiveIntegerField(default=0, editable=False)
+    # Review aggregates, kept up to date by the signals in review/signals.py.
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_review_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="pet_search_vector_gin"),
+            GinIndex(
+                fields=["name"], name="pet_name_trgm_gin", opclasses=["gin_trgm_ops"]
+            ),
+            # Public catalog: approved + public pets ordered by recency or fees.
+            models.Index(
+                fields=["updated_at", "id"],
+                name="pet_public_updated_idx",
+                condition=models.Q(status="approved", visibility="public"),
+            ),
+            models.Index(
+                fields=["fees", "id"],
+                name="pet_public_fees_idx",
+                condition=models.Q(status="approved", visibility="public"),
+            ),
+            models.Index(
+                fields=["views", "id"],
+                name="pet_public_views_idx",
+                condition=models.Q(status="approved", visibility="public"),
+            ),
+            models.Index(
+                fields=["review_count", "id"],
+                name="pet_public_reviews_idx",
+                condition=models.Q(status="approved", visibility="public"),
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_search_source = instance.get_search_source()
+        return instance
+
+    def get_search_source(self):
+        # Deferred fields read as None rather than loading them.
+        return tuple(
+            self.__dict__.get(name)
+            for name in ("name", "breed", "description", "category_id")
+        )
+
+    def search_source_changed(self, update_fields=None):
+        sources = {*PET_SEARCH_FIELDS, "category_id"}
+        if update_fields is not None and not sources.intersection(update_fields):
+            return False
+        loaded = getattr(self, "_loaded_search_source", None)
+        return loaded is None or loaded != self.get_search_source()
+
+    def save(self, *args, **kwargs):
+        # The search document is written by the same INSERT or UPDATE, and
+        # only when one of the fields it is built from changed.
+        using = kwargs.get("using") or router.db_for_write(Pet, instance=self)
+        update_fields = kwargs.get("update_fields")
+        write_vector = supports_search(using) and self.search_source_changed(
+            update_fields
+        )
+        if write_vector:
+            category_name = self.category.name if self.category_id else None
+            self.search_vector = pet_document_vector(self, category_name)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_vector"}
+        super().save(*args, **kwargs)
+        if write_vector:
+            # Holds the expression until read back from the database.
+            del self.search_vector
+        self._loaded_search_source = self.get_search_source()
+
 
 class Adoption(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -93,5 +173,10 @@ class Adoption(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["pet", "date"], name="adoption_pet_date_idx"),
+        ]
+
     def __str__(self):
         return f"Adoption of {self.pet.name} on {self.date.isoformat()}"
@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.utils import timezone
+
+from pet.cache import invalidate_catalog
+from pet.models import PetStatus
+
+# Target status -> statuses a pet may be moved from. Adopted pets are final.
+PET_STATUS_TRANSITIONS = {
+    PetStatus.APPROVED: [PetStatus.PENDING, PetStatus.SUSPENDED, PetStatus.WITHDRAWN],
+    PetStatus.SUSPENDED: [PetStatus.PENDING, PetStatus.APPROVED],
+    PetStatus.WITHDRAWN: [PetStatus.PENDING, PetStatus.APPROVED, PetStatus.SUSPENDED],
+}
+
+IDS_CHUNK_SIZE = 10000
+
+
+def transition_pets(queryset, status, ids=None):
+    """
+    Move every pet in ``queryset`` (optionally limited to ``ids``) whose
+    current status allows it to ``status``, with set-based ``UPDATE``s that
+    never load the rows. Returns the number of pets changed.
+    """
+    allowed = PET_STATUS_TRANSITIONS[status]
+    queryset = queryset.filter(status__in=allowed)
+    now = timezone.now()
+
+    with transaction.atomic():
+        if ids is None:
+            updated = queryset.update(status=status, updated_at=now)
+        else:
+            updated = 0
+            for start in range(0, len(ids), IDS_CHUNK_SIZE):
+                chunk = ids[start : start + IDS_CHUNK_SIZE]
+                updated += queryset.filter(pk__in=chunk).update(
+                    status=status, updated_at=now
+                )
+        if updated:
+            invalidate_catalog()
+    return updated
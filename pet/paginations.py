@@ -1,9 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from api.paginations import KeysetPageNumberPagination
 
 
-class PetsPagination(PageNumberPagination):
+class PetsPagination(KeysetPageNumberPagination):
     page_size = 10
+    keyset_ordering = ("-updated_at",)
 
 
-class AdoptionHistoryPagination(PageNumberPagination):
+class AdoptionHistoryPagination(KeysetPageNumberPagination):
     page_size = 10
+    keyset_ordering = ("-created_at",)
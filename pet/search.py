@@ -0,0 +1,59 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import connections
+from django.db.models import CharField, Value
+
+PET_SEARCH_CONFIG = "english"
+PET_SEARCH_FIELDS = {"name", "breed", "description", "category"}
+
+
+def _search_document(name, category, breed, description):
+    return (
+        SearchVector(name, weight="A", config=PET_SEARCH_CONFIG)
+        + SearchVector(category, weight="B", config=PET_SEARCH_CONFIG)
+        + SearchVector(breed, weight="B", config=PET_SEARCH_CONFIG)
+        + SearchVector(description, weight="C", config=PET_SEARCH_CONFIG)
+    )
+
+
+def _text(value):
+    return Value(value or "", output_field=CharField())
+
+
+def pet_search_vector(category_name=None):
+    """
+    Weighted search document for a pet. The category name is passed in as a
+    value since ``UPDATE`` statements cannot reference joined columns.
+    """
+    return _search_document("name", _text(category_name), "breed", "description")
+
+
+def pet_document_vector(pet, category_name=None):
+    """
+    The document of ``pet_search_vector`` built from the values of ``pet``,
+    so the ``INSERT`` or ``UPDATE`` of ``Pet.save()`` can write it too.
+    """
+    return _search_document(
+        _text(pet.name), _text(category_name), _text(pet.breed), _text(pet.description)
+    )
+
+
+def supports_search(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def refresh_search_vectors(pets, using="default"):
+    """Fill ``search_vector`` for pets written without ``save()``."""
+    if not supports_search(using):
+        return
+
+    by_category = {}
+    for pet in pets:
+        name = pet.category.name if pet.category_id else None
+        by_category.setdefault(name, []).append(pet.pk)
+
+    from pet.models import Pet
+
+    for name, pks in by_category.items():
+        Pet.objects.using(using).filter(pk__in=pks).update(
+            search_vector=pet_search_vector(name)
+        )
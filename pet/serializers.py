@@ -1,6 +1,15 @@
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
+from api.serializers import (
+    PreloadedRelatedField,
+    SparseFieldsetMixin,
+    preload_related,
+)
+from category.models import Category
+from .adoption import adopt_pet
+from .fitlers import PetFilter
 from .models import Pet, Adoption
+from .moderation import PET_STATUS_TRANSITIONS
 from django.contrib.auth import get_user_model
 
 
@@ -22,7 +31,7 @@ class PetCategorySerializer(serializers.ModelSerializer):
         ]
 
 
-class PetSerializer(serializers.ModelSerializer):
+class PetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner = PetOwnerSerializer(read_only=True)
     category_name = serializers.CharField(
         source="category.name",
@@ -41,6 +50,9 @@ class PetSerializer(serializers.ModelSerializer):
             "breed",
             "age",
             "owner",
+            "views",
+            "review_count",
+            "latest_review_at",
         ]
 
         read_only_fields = [
@@ -54,6 +66,20 @@ class PetSerializer(serializers.ModelSerializer):
         }
 
 
+class PetBulkSerializer(PetSerializer):
+    category = PreloadedRelatedField(
+        "categories",
+        queryset=Category.objects.all(),
+        write_only=True,
+        required=False,
+        allow_null=True,
+    )
+
+    @staticmethod
+    def load_categories(items):
+        return preload_related(items, "category", Category.objects.all())
+
+
 class MyPetSerializer(PetSerializer):
     class Meta(PetSerializer.Meta):
         fields = [
@@ -89,6 +115,27 @@ class PetUpdateSerializer(serializers.ModelSerializer):
         ]
 
 
+class PetModerationSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=list(PET_STATUS_TRANSITIONS))
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False)
+    filter = serializers.DictField(required=False)
+
+    def validate_filter(self, value):
+        # PetFilter ignores unknown and empty keys, which would silently
+        # widen the selection to every pet.
+        unknown = sorted(set(value) - set(PetFilter.base_filters))
+        if unknown:
+            raise ValidationError(f"Unknown filters: {', '.join(unknown)}.")
+        if all(item in (None, "") for item in value.values()):
+            raise ValidationError("Set at least one filter value.")
+        return value
+
+    def validate(self, attrs):
+        if not attrs.get("ids") and "filter" not in attrs:
+            raise ValidationError("Provide pet ids, a filter or both.")
+        return attrs
+
+
 class AdoptedBySerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
@@ -116,21 +163,5 @@ class AdoptionHistorySerializer(serializers.ModelSerializer):
             "date",
         ]
 
-    def validate(self, attrs):
-        view = self.context.get("view")
-        if not view:
-            raise ValidationError("View context is missing.")
-
-        pet_pk = view.kwargs.get("pets_pk")
-        try:
-            pet = Pet.objects.get(pk=pet_pk)
-        except Pet.DoesNotExist:
-            raise ValidationError("Pet not found.")
-
-        if pet.status == Pet.ADOPTED:
-            raise ValidationError("This pet is already adopted!")
-        if view.request.user.balance < pet.fees:
-            raise ValidationError("Insufficient balance")
-
-        self.context["pet_instance"] = pet
-        return attrs
+    def create(self, validated_data):
+        return adopt_pet(validated_data["pet_id"], validated_data["adopted_by"])
@@ -1,9 +1,43 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
+from category.models import Category
+from pet.cache import invalidate_catalog
 from pet.models import Adoption, Pet
+from pet.search import pet_search_vector, supports_search
 
 
 @receiver(post_save, sender=Adoption)
 def assign_default_role(sender, instance, created, **kwargs):
     if created:
-        Pet.objects.filter(pk=instance.pet_id).update(status=Pet.ADOPTED)
+        # pet.adoption.adopt_pet claims the pet itself before saving.
+        if not getattr(instance, "pet_claimed", False):
+            Pet.objects.filter(pk=instance.pet_id).update(status=Pet.ADOPTED)
+        invalidate_catalog()
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(sender, instance, **kwargs):
+    if not supports_search(kwargs["using"]):
+        return
+    Pet.objects.filter(category_id=instance.pk).update(
+        search_vector=pet_search_vector(instance.name)
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def clear_category_search_vectors(sender, instance, **kwargs):
+    # Before the delete sets their category to NULL, so only the pets of
+    # this category are rewritten. Runs in the transaction of the delete.
+    if not supports_search(kwargs["using"]):
+        return
+    Pet.objects.filter(category_id=instance.pk).update(
+        search_vector=pet_search_vector()
+    )
@@ -0,0 +1,322 @@
+import logging
+import re
+import threading
+import time
+import uuid
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.db import close_old_connections
+from django.utils import timezone
+
+from pet.cache import get_catalog_version
+from pet.models import Pet
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS = {
+    "category": 3.0,
+    "breed": 2.0,
+    "age": 1.0,
+    "fees": 1.0,
+    "description": 2.0,
+}
+AGE_SCALE = 3.0
+DESCRIPTION_DIMENSIONS = 16
+INITIAL_CAPACITY = 1024
+BUILD_CHUNK_SIZE = 10000
+# Rebuild from scratch periodically to drop deleted pets and compact rows.
+INDEX_MAX_AGE = 60 * 60
+# Re-read rows a little older than the last sync to catch late commits.
+SYNC_OVERLAP = timedelta(minutes=1)
+# Past this many changed pets a background rebuild is cheaper than
+# re-reading them on the request.
+MAX_INCREMENTAL_CHANGES = 10000
+
+_TOKEN_RE = re.compile(r"[a-z]{3,}")
+_FIELDS = ("id", "category_id", "breed", "age", "fees", "description")
+
+
+def description_vector(text):
+    """Hashed bag of words, L2 normalized, stable across processes."""
+    vector = np.zeros(DESCRIPTION_DIMENSIONS, dtype=np.float32)
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        vector[zlib.crc32(token.encode()) % DESCRIPTION_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def _breed_key(breed):
+    return (breed or "").strip().lower()
+
+
+class PetFeatures:
+    """
+    Feature matrix of the indexed pets: one row per pet, plus a map from pet
+    id to row so changed pets are found without scanning the ids.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.size = 0
+        self.rows = {}
+        self.categories = {}
+        self.breeds = {}
+        self.ids = np.zeros(capacity, dtype="S16")
+        self.category_codes = np.full(capacity, -1, dtype=np.int32)
+        self.breed_codes = np.full(capacity, -1, dtype=np.int32)
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.log_fees = np.zeros(capacity, dtype=np.float32)
+        self.descriptions = np.zeros(
+            (capacity, DESCRIPTION_DIMENSIONS), dtype=np.float32
+        )
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # Catalog version and time the rows were read at.
+        self.version = None
+        self.synced_at = None
+        self.built_at = None
+
+    @classmethod
+    def build(cls, rows, chunk_size=BUILD_CHUNK_SIZE):
+        """Features of ``rows``, tuples of ``_FIELDS`` with distinct ids."""
+        features = cls()
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                features.extend(chunk)
+                chunk = []
+        if chunk:
+            features.extend(chunk)
+        features.built_at = time.monotonic()
+        return features
+
+    def _reserve(self, size):
+        capacity = len(self.ids)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in (
+            "ids",
+            "category_codes",
+            "breed_codes",
+            "ages",
+            "log_fees",
+            "descriptions",
+            "active",
+        ):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, name, grown)
+
+    def _code(self, mapping, value, create=True):
+        if value is None or value == "":
+            return -1
+        if value not in mapping and create:
+            mapping[value] = len(mapping)
+        return mapping.get(value, -1)
+
+    def features(self, category_id, breed, age, fees, description, create=True):
+        return (
+            self._code(self.categories, category_id, create),
+            self._code(self.breeds, _breed_key(breed), create),
+            float(age),
+            float(np.log1p(max(fees, 0.0))),
+            description_vector(description),
+        )
+
+    def extend(self, rows):
+        """Append pets that are not indexed yet, one column at a time."""
+        start = self.size
+        end = start + len(rows)
+        self._reserve(end)
+        pks, category_ids, breeds, ages, fees, descriptions = zip(*rows)
+
+        self.ids[start:end] = [pk.bytes for pk in pks]
+        self.category_codes[start:end] = [
+            self._code(self.categories, value) for value in category_ids
+        ]
+        self.breed_codes[start:end] = [
+            self._code(self.breeds, _breed_key(value)) for value in breeds
+        ]
+        self.ages[start:end] = ages
+        self.log_fees[start:end] = np.log1p(np.maximum(np.asarray(fees), 0.0))
+        for row, text in enumerate(descriptions, start):
+            self.descriptions[row] = description_vector(text)
+        self.active[start:end] = True
+
+        self.rows.update((pk.bytes, row) for row, pk in enumerate(pks, start))
+        self.size = end
+
+    def upsert(self, pk, category_id, breed, age, fees, description):
+        row = self.rows.get(pk.bytes)
+        if row is None:
+            self.extend([(pk, category_id, breed, age, fees, description)])
+            return
+        (
+            self.category_codes[row],
+            self.breed_codes[row],
+            self.ages[row],
+            self.log_fees[row],
+            self.descriptions[row],
+        ) = self.features(category_id, breed, age, fees, description)
+        self.active[row] = True
+
+    def remove(self, pk):
+        row = self.rows.get(pk.bytes)
+        if row is not None:
+            self.active[row] = False
+
+    def similar_ids(self, pet, limit):
+        # Changes are applied in place while other requests score, so read a
+        # consistent prefix: rows below ``size`` are never moved or dropped.
+        size = self.size
+        ids = self.ids[:size]
+        category_codes = self.category_codes[:size]
+        breed_codes = self.breed_codes[:size]
+        ages = self.ages[:size]
+        all_log_fees = self.log_fees[:size]
+        descriptions = self.descriptions[:size]
+        active = self.active[:size]
+        category, breed, age, log_fees, description = self.features(
+            pet.category_id,
+            pet.breed,
+            pet.age,
+            pet.fees,
+            pet.description,
+            create=False,
+        )
+
+        scores = WEIGHTS["age"] * np.exp(-np.abs(ages - age) / AGE_SCALE)
+        scores += WEIGHTS["fees"] * np.exp(-np.abs(all_log_fees - log_fees))
+        scores += WEIGHTS["description"] * (descriptions @ description)
+        if category >= 0:
+            scores += WEIGHTS["category"] * (category_codes == category)
+        if breed >= 0:
+            scores += WEIGHTS["breed"] * (breed_codes == breed)
+
+        scores[~active] = -np.inf
+        row = self.rows.get(pet.pk.bytes)
+        if row is not None and row < size:
+            scores[row] = -np.inf
+
+        limit = min(limit, int(np.count_nonzero(np.isfinite(scores))))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        # "S16" drops trailing NUL bytes on access, so pad them back.
+        return [uuid.UUID(bytes=bytes(key).ljust(16, b"\0")) for key in ids[top]]
+
+
+def load_pet_features():
+    """Build ``PetFeatures`` of every approved public pet."""
+    version = get_catalog_version()
+    synced_at = timezone.now()
+    rows = (
+        Pet.objects.filter(status=Pet.APPROVED, visibility=Pet.PUBLIC)
+        .values_list(*_FIELDS)
+        .iterator(chunk_size=BUILD_CHUNK_SIZE)
+    )
+    features = PetFeatures.build(rows)
+    features.version = version
+    features.synced_at = synced_at
+    return features
+
+
+class SimilarPetIndex:
+    """
+    In-memory feature matrix of approved public pets used to rank similar
+    pets with one vectorized pass.
+
+    Each process keeps its own copy. Only the first build runs on a request;
+    later rebuilds happen on a background thread and are swapped in whole,
+    while requests keep reading the previous matrix. Between rebuilds, pets
+    updated since the last sync are re-read whenever the catalog version
+    moves. Deleted pets may linger until the next rebuild, so callers must
+    re-check candidates against the database.
+    """
+
+    def __init__(self):
+        # Serializes changes to the current features and their swap.
+        self.lock = threading.Lock()
+        # Held by whoever builds the first features of the process.
+        self.build_lock = threading.Lock()
+        self.features = None
+        self.rebuilding = False
+
+    def sync(self):
+        features = self.features
+        if features is None:
+            with self.build_lock:
+                if self.features is None:
+                    self.features = load_pet_features()
+            return
+
+        if time.monotonic() - features.built_at > INDEX_MAX_AGE:
+            self.rebuild_in_background()
+        version = get_catalog_version()
+        if version != features.version:
+            self._apply_changes(features, version)
+
+    def _apply_changes(self, features, version):
+        synced_at = timezone.now()
+        rows = list(
+            Pet.objects.filter(
+                updated_at__gte=features.synced_at - SYNC_OVERLAP
+            ).values_list(*_FIELDS, "status", "visibility")[
+                : MAX_INCREMENTAL_CHANGES + 1
+            ]
+        )
+        if len(rows) > MAX_INCREMENTAL_CHANGES:
+            self.rebuild_in_background()
+            # The rebuilt features will include these changes.
+            features.version = version
+            return
+
+        with self.lock:
+            for *fields, status, visibility in rows:
+                if status == Pet.APPROVED and visibility == Pet.PUBLIC:
+                    features.upsert(*fields)
+                else:
+                    features.remove(fields[0])
+            features.synced_at = max(features.synced_at, synced_at)
+            features.version = version
+
+    def rebuild_in_background(self):
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        threading.Thread(
+            target=self._rebuild, name="similar-pets-rebuild", daemon=True
+        ).start()
+
+    def _rebuild(self):
+        close_old_connections()
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Failed to rebuild the similar pets index")
+        finally:
+            self.rebuilding = False
+            close_old_connections()
+
+    def rebuild(self):
+        """Build new features without holding the lock, then swap them in."""
+        features = load_pet_features()
+        with self.lock:
+            self.features = features
+
+    def similar_ids(self, pet, limit):
+        """Ids of the ``limit`` best scoring indexed pets other than ``pet``."""
+        self.sync()
+        return self.features.similar_ids(pet, limit)
+
+
+similar_pet_index = SimilarPetIndex()
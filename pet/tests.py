@@ -1,3 +1,955 @@
-from django.test import TestCase
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import get_values_plan
+from category.models import Category
+from pet import serializers as pet_serializers
+from payment.ledger import credit, get_balance
+from payment.models import LedgerEntry, PaymentHistory, RunningBalance
+from pet.adoption import adopt_pet
+from pet.cache import (
+    REBUILD_WAIT_ATTEMPTS,
+    bump_catalog_version,
+    cached_response,
+    get_cache_key,
+)
+from pet.counters import (
+    PetViewCounter,
+    get_views_version,
+    pet_view_counter,
+    write_pet_views,
+)
+from pet.facets import AGE_BANDS, FACETS, FEE_BANDS, grouping_masks, pet_facet_counts
+from pet.models import Adoption, Pet
+from review.models import Review
+from pet.similarity import PetFeatures, SimilarPetIndex
+
+User = get_user_model()
+
+# Benchmarks are slow and only print timings; run them with BENCHMARK=1.
+BENCHMARK = bool(os.environ.get("BENCHMARK"))
+
+
+def make_pets(count, owner, category, **fields):
+    pets = [
+        Pet(
+            name=f"pet{index}",
+            breed="lab" if index % 2 else "siamese",
+            age=index % 12,
+            description=f"friendly pet {index}",
+            fees=float(index * 10 % 300),
+            status=Pet.APPROVED,
+            visibility=Pet.PUBLIC,
+            category=category,
+            owner=owner,
+        )
+        for index in range(count)
+    ]
+    for pet in pets:
+        for name, value in fields.items():
+            setattr(pet, name, value)
+    return Pet.objects.bulk_create(pets)
+
+
+class PetIndexUsageTests(TestCase):
+    """The access path indexes of migration pet/0009 serve the hot queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        category = Category.objects.create(name="Dog")
+        make_pets(300, owner, category)
+        make_pets(300, owner, category, status=Pet.PENDING)
+        make_pets(300, owner, category, visibility=Pet.PRIVATE)
+        cls.pet = Pet.objects.first()
+        Adoption.objects.bulk_create(
+            Adoption(pet=pet, adopted_by=owner) for pet in Pet.objects.all()[:200]
+        )
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # A few hundred rows fit in one page; make the planner show
+                # which index it would pick on a real catalog.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("ANALYZE")
+        return queryset.explain()
+
+    def public_pets(self):
+        return Pet.objects.filter(status=Pet.APPROVED, visibility=Pet.PUBLIC)
+
+    def test_public_list_by_updated_at_uses_partial_index(self):
+        plan = self.explain(self.public_pets().order_by("-updated_at", "-id")[:10])
+        self.assertIn("pet_public_updated_idx", plan)
+
+    def test_public_list_by_fees_uses_partial_index(self):
+        plan = self.explain(self.public_pets().order_by("fees", "id")[:10])
+        self.assertIn("pet_public_fees_idx", plan)
+
+    def test_public_list_by_views_uses_partial_index(self):
+        plan = self.explain(self.public_pets().order_by("-views", "-id")[:10])
+        self.assertIn("pet_public_views_idx", plan)
+
+    def test_adoption_history_uses_pet_date_index(self):
+        plan = self.explain(
+            Adoption.objects.filter(pet=self.pet).order_by("-date")[:10]
+        )
+        self.assertIn("adoption_pet_date_idx", plan)
+
+
+class PetValuesListTests(TestCase):
+    """The ``.values()`` fast path renders the same JSON as the serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(
+            username="owner", email="owner@example.com", first_name="Ow"
+        )
+        cls.admin = User.objects.create(
+            username="admin", email="admin@example.com", is_staff=True
+        )
+        category = Category.objects.create(name="Dog")
+        make_pets(8, cls.owner, category)
+        # Null relations go through the nested and dotted source fallbacks.
+        make_pets(4, None, None, name="a stray")
+        make_pets(3, cls.owner, category, visibility=Pet.PRIVATE)
+        # Distinct fees so that ?ordering=fees gives one order.
+        pets = list(Pet.objects.order_by("name", "id"))
+        for index, pet in enumerate(pets):
+            pet.fees = float(index)
+        Pet.objects.bulk_update(pets, ["fees"])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def expected(self, serializer_class, queryset, request):
+        serializer = serializer_class(queryset, many=True, context={"request": request})
+        return JSONRenderer().render(serializer.data)
+
+    def assert_parity(self, url, serializer_class, queryset):
+        response = self.client.get(url, {"ordering": "fees"})
+        self.assertEqual(response.status_code, 200)
+        pets = queryset.select_related("category", "owner").order_by("fees")
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),
+            self.expected(
+                serializer_class, pets[:10], response.renderer_context["request"]
+            ),
+        )
+
+    def test_public_list(self):
+        self.assert_parity(
+            "/api/v1/pets/",
+            pet_serializers.PetSerializer,
+            Pet.objects.filter(status=Pet.APPROVED, visibility=Pet.PUBLIC),
+        )
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assert_parity(
+            "/api/v1/pets/", pet_serializers.AdminPetSerializer, Pet.objects.all()
+        )
+
+    def test_my_pets(self):
+        self.client.force_authenticate(self.owner)
+        self.assert_parity(
+            "/api/v1/pets/my_pet/",
+            pet_serializers.MyPetSerializer,
+            Pet.objects.filter(owner=self.owner),
+        )
+
+
+@skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+class PetValuesListBenchmark(TestCase):
+    page_sizes = (10, 100, 1000)
+    repeat = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        make_pets(max(cls.page_sizes), owner, Category.objects.create(name="Dog"))
+
+    def best_of(self, render):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def test_page_sizes(self):
+        serializer_class = pet_serializers.PetSerializer
+        plan = get_values_plan(serializer_class)
+        queryset = Pet.objects.select_related("category", "owner").order_by("id")
+        serializer = serializer_class()
+        paths = plan.get_paths(serializer.fields)
+
+        print()
+        for size in self.page_sizes:
+            page = queryset[:size]
+            regular = self.best_of(
+                lambda: serializer_class(list(page.all()), many=True).data
+            )
+            fast = self.best_of(
+                lambda: plan.to_representation(page.values(*paths), serializer)
+            )
+            print(
+                f"page size {size:>4}: serializer {regular * 1000:8.2f} ms, "
+                f"values() {fast * 1000:8.2f} ms, {regular / fast:4.1f}x"
+            )
+        # Small pages are dominated by the query itself.
+        self.assertLess(fast, regular)
+
+
+class PetModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username="admin", email="admin@example.com", is_staff=True
+        )
+        category = Category.objects.create(name="Dog")
+        make_pets(5, cls.admin, category, status=Pet.PENDING)
+        Pet.objects.filter(name="pet1").update(name="buddy")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def moderate(self, data):
+        return self.client.post("/api/v1/pets/moderate/", data, format="json")
+
+    def test_unknown_filter_is_rejected(self):
+        response = self.moderate({"status": "approved", "filter": {"name": "b1"}})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pet.objects.filter(status=Pet.APPROVED).exists())
+
+    def test_empty_filter_is_rejected(self):
+        for selection in ({}, {"name__contains": ""}):
+            response = self.moderate({"status": "approved", "filter": selection})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pet.objects.filter(status=Pet.APPROVED).exists())
+
+    def test_filter_selects_matching_pets(self):
+        response = self.moderate(
+            {"status": "approved", "filter": {"name__contains": "budd"}}
+        )
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(
+            list(
+                Pet.objects.filter(status=Pet.APPROVED).values_list("name", flat=True)
+            ),
+            ["buddy"],
+        )
+
+
+@skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+class SimilarPetIndexBenchmark(SimpleTestCase):
+    sizes = (100_000, 1_000_000)
+    changes = 1000
+    queries = 20
+    words = "calm playful loyal friendly trained quiet shy curious gentle".split()
+
+    def make_rows(self, count, generator):
+        categories = [uuid.UUID(int=index) for index in range(1, 21)]
+        breeds = [f"breed {index}" for index in range(50)]
+        return [
+            (
+                uuid.UUID(int=generator.getrandbits(128)),
+                generator.choice(categories),
+                generator.choice(breeds),
+                generator.randrange(15),
+                float(generator.randrange(500)),
+                " ".join(generator.sample(self.words, 4)),
+            )
+            for _ in range(count)
+        ]
+
+    def test_sizes(self):
+        generator = random.Random(0)
+        print()
+        for size in self.sizes:
+            rows = self.make_rows(size, generator)
+
+            started = time.perf_counter()
+            features = PetFeatures.build(iter(rows))
+            build = time.perf_counter() - started
+
+            changed = [
+                (row[0], *self.make_rows(1, generator)[0][1:])
+                for row in generator.sample(rows, self.changes)
+            ]
+            started = time.perf_counter()
+            for row in changed:
+                features.upsert(*row)
+            sync = time.perf_counter() - started
+
+            timings = []
+            for row in generator.sample(rows, self.queries):
+                pet = SimpleNamespace(
+                    pk=row[0],
+                    category_id=row[1],
+                    breed=row[2],
+                    age=row[3],
+                    fees=row[4],
+                    description=row[5],
+                )
+                started = time.perf_counter()
+                features.similar_ids(pet, 20)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+
+            print(
+                f"{size:>9,} pets: build {build:6.2f} s, "
+                f"{self.changes} changes {sync * 1000:7.1f} ms, "
+                f"query median {timings[len(timings) // 2] * 1000:6.2f} ms"
+            )
+            self.assertEqual(features.size, size)
+
+
+class SimilarPetIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        cls.dogs = make_pets(5, owner, Category.objects.create(name="Dog"))
+        cls.cats = make_pets(
+            5, owner, Category.objects.create(name="Cat"), breed="persian"
+        )
+
+    def setUp(self):
+        self.index = SimilarPetIndex()
+
+    def test_ranks_same_category_first(self):
+        ids = self.index.similar_ids(self.dogs[0], 4)
+        self.assertEqual(set(ids), {pet.pk for pet in self.dogs[1:]})
+
+    def test_applies_changes_when_the_catalog_moves(self):
+        self.index.similar_ids(self.dogs[0], 4)
+        hidden = self.dogs[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            hidden.visibility = Pet.PRIVATE
+            hidden.save()
+        self.assertNotIn(hidden.pk, self.index.similar_ids(self.dogs[0], 9))
+
+    def test_rebuild_swaps_in_new_features(self):
+        self.index.sync()
+        features = self.index.features
+        self.index.rebuild()
+        self.assertIsNot(self.index.features, features)
+        self.assertEqual(self.index.features.size, 10)
+
+
+class PetIncludeTests(TestCase):
+    """``?include=`` embeds related collections with a fixed query count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username="admin", email="admin@example.com", is_staff=True
+        )
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        category = Category.objects.create(name="Dog")
+        cls.pet, cls.hidden = make_pets(2, cls.admin, category)
+        cls.hidden.status = Pet.PENDING
+        cls.hidden.save()
+
+        reviewers = [
+            User.objects.create(username=f"reviewer{index}", email=f"r{index}@x.com")
+            for index in range(12)
+        ]
+        for reviewer in reviewers:
+            Review.objects.create(pet=cls.pet, reviewer=reviewer, comments="Good")
+        # Past adoptions; bulk_create leaves the pet approved.
+        Adoption.objects.bulk_create(
+            Adoption(pet=cls.pet, adopted_by=reviewer) for reviewer in reviewers
+        )
+        for index, user in enumerate([cls.user] * 12 + [cls.admin] * 3):
+            PaymentHistory.objects.create(
+                transaction_id=f"tx{index}",
+                amount=10,
+                payment_method="card",
+                pet=cls.pet,
+                user=user,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        pet_view_counter.reset()
+        self.addCleanup(pet_view_counter.reset)
+
+    def retrieve(self, pet, include, **params):
+        return self.client.get(
+            f"/api/v1/pets/{pet.pk}/", {"include": include, **params}
+        )
+
+    def test_admin_query_count(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(4):
+            response = self.retrieve(self.pet, "reviews,adoptions,payments")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["reviews"]), 10)
+        self.assertEqual(len(response.data["adoptions"]), 10)
+        self.assertEqual(len(response.data["payments"]), 10)
+
+    def test_user_query_count(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            response = self.retrieve(self.pet, "reviews,adoptions,payments")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("adoptions", response.data)
+        self.assertEqual(len(response.data["payments"]), 10)
+
+    def test_anonymous_query_count(self):
+        with self.assertNumQueries(2):
+            response = self.retrieve(self.pet, "reviews,payments")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("payments", response.data)
+        self.assertEqual(len(response.data["reviews"]), 10)
+
+    def test_hidden_pet_is_not_prefetched(self):
+        with self.assertNumQueries(1):
+            response = self.retrieve(self.hidden, "reviews")
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fields_only_apply_to_the_pet(self):
+        self.client.force_authenticate(self.admin)
+        response = self.retrieve(self.pet, "payments", fields="id,name")
+        self.assertEqual(set(response.data), {"id", "name", "payments"})
+        self.assertIn("amount", response.data["payments"][0])
+
+
+class AdoptPetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="owner", email="owner@example.com")
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        cls.pets = make_pets(2, cls.owner, Category.objects.create(name="Dog"))
+        for pet in cls.pets:
+            pet.fees = 300
+            pet.save()
+        credit(cls.user, 500, LedgerEntry.OPENING)
+
+    def test_adoption_statements(self):
+        # Savepoint, claim, adoption, guarded debit, ledger entry, release.
+        with self.assertNumQueries(6):
+            adopt_pet(self.pets[0].pk, self.user)
+        self.assertEqual(get_balance(self.user), 200)
+        self.assertEqual(RunningBalance.objects.get(user=self.user).amount, 200)
+
+    def test_insufficient_balance_rolls_back(self):
+        adopt_pet(self.pets[0].pk, self.user)
+        with self.assertRaisesMessage(ValidationError, "Insufficient balance"):
+            adopt_pet(self.pets[1].pk, self.user)
+        self.pets[1].refresh_from_db()
+        self.assertEqual(self.pets[1].status, Pet.APPROVED)
+        self.assertFalse(Adoption.objects.filter(pet=self.pets[1]).exists())
+        self.assertEqual(RunningBalance.objects.get(user=self.user).amount, 200)
+
+
+@skipUnless(BENCHMARK, "set BENCHMARK=1 to run benchmarks")
+class ParallelAdoptionBenchmark(TransactionTestCase):
+    """Many adopters racing for the same pets and the same balances."""
+
+    users = 20
+    pets = 200
+    attempts = 2000
+    threads = 16
+    # Each user can afford this many pets.
+    affordable = 5
+
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("concurrent writers need PostgreSQL")
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        self.pet_ids = [
+            pet.pk
+            for pet in make_pets(
+                self.pets, owner, Category.objects.create(name="Dog"), fees=100
+            )
+        ]
+        self.adopters = [
+            User.objects.create(username=f"adopter{index}", email=f"a{index}@x.com")
+            for index in range(self.users)
+        ]
+        for adopter in self.adopters:
+            credit(adopter, 100 * self.affordable, LedgerEntry.OPENING)
+
+    def adopt(self, pet_id, user):
+        try:
+            adopt_pet(pet_id, user)
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connections.close_all()
+
+    def test_parallel_adopters(self):
+        rng = random.Random(0)
+        attempts = [
+            (rng.choice(self.pet_ids), rng.choice(self.adopters))
+            for _ in range(self.attempts)
+        ]
+        barrier = threading.Barrier(self.threads)
+
+        def start(_):
+            barrier.wait()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            list(pool.map(start, range(self.threads)))
+            started = time.perf_counter()
+            adopted = sum(pool.map(lambda args: self.adopt(*args), attempts))
+            elapsed = time.perf_counter() - started
+
+        print(
+            f"\n{self.attempts} attempts on {self.threads} threads: "
+            f"{adopted} adopted in {elapsed:.2f}s, "
+            f"{self.attempts / elapsed:.0f} attempts/s"
+        )
+        self.assertEqual(Adoption.objects.count(), adopted)
+        self.assertEqual(Adoption.objects.values("pet").distinct().count(), adopted)
+        self.assertLessEqual(adopted, self.users * self.affordable)
+        totals = dict(
+            LedgerEntry.objects.order_by()
+            .values_list("user_id")
+            .annotate(total=Sum("amount"))
+        )
+        for balance in RunningBalance.objects.all():
+            self.assertGreaterEqual(balance.amount, 0)
+            self.assertEqual(balance.amount, totals[balance.user_id])
+
+
+class PetKeysetPaginationTests(TestCase):
+    """Cursor pages over ``latest_review_at``, which is NULL until reviewed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        cls.pets = make_pets(25, owner, Category.objects.create(name="Dog"))
+        reviewed_at = timezone.now()
+        for index, pet in enumerate(cls.pets[:12]):
+            # Pairs of ties fall back on the primary key.
+            pet.latest_review_at = reviewed_at - timedelta(hours=index // 2)
+        Pet.objects.bulk_update(cls.pets, ["latest_review_at"])
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([pet["id"] for pet in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def test_nulls_come_last_both_ways(self):
+        for ordering in ("-latest_review_at", "latest_review_at"):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(f"/api/v1/pets/?cursor=&ordering={ordering}", "next")
+                ids = [pet_id for page in pages for pet_id in page]
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertEqual(set(ids), {str(pet.pk) for pet in self.pets})
+                reviewed = {str(pet.pk) for pet in self.pets[:12]}
+                self.assertEqual(set(ids[:12]), reviewed)
+
+                # Walking back from the last page visits the same pages.
+                last = self.client.get(f"/api/v1/pets/?cursor=&ordering={ordering}")
+                for _ in pages[1:]:
+                    last = self.client.get(last.data["next"])
+                self.assertEqual(
+                    self.walk(last.data["previous"], "previous"), pages[-2::-1]
+                )
+
+
+class PetSearchDocumentTests(TestCase):
+    """``Pet.save()`` writes ``search_vector`` itself, and only when needed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        cls.category = Category.objects.create(name="Dog")
+        cls.pet, cls.stray = make_pets(2, owner, cls.category)
+        cls.stray.category = None
+        cls.stray.save()
+
+    def test_source_changes(self):
+        pet = Pet.objects.get(pk=self.pet.pk)
+        self.assertFalse(pet.search_source_changed())
+        pet.status = Pet.SUSPENDED
+        self.assertFalse(pet.search_source_changed())
+        pet.name = "Rex"
+        self.assertTrue(pet.search_source_changed())
+        self.assertTrue(pet.search_source_changed(["name"]))
+        self.assertFalse(pet.search_source_changed(["status"]))
+        pet.save()
+        self.assertFalse(pet.search_source_changed())
+
+    def test_new_and_deferred_pets(self):
+        self.assertTrue(Pet(name="Rex").search_source_changed())
+        pet = Pet.objects.only("id", "status").get(pk=self.pet.pk)
+        self.assertFalse(pet.search_source_changed())
+
+    @skipUnless(connection.vendor == "postgresql", "search needs PostgreSQL")
+    def test_save_writes_the_vector_in_one_statement(self):
+        pet = Pet.objects.select_related("category").get(pk=self.pet.pk)
+        pet.name = "Biscuit"
+        with self.assertNumQueries(1):
+            pet.save(update_fields=["name"])
+        self.assertTrue(Pet.objects.filter(search_vector="biscuit").exists())
+        with self.assertNumQueries(1):
+            pet.save(update_fields=["status"])
+
+    @skipUnless(connection.vendor == "postgresql", "search needs PostgreSQL")
+    def test_category_delete_only_rewrites_its_pets(self):
+        Pet.objects.filter(pk=self.stray.pk).update(search_vector=None)
+        self.category.delete()
+        self.assertIsNone(Pet.objects.get(pk=self.stray.pk).search_vector)
+        self.assertFalse(Pet.objects.filter(search_vector="dog").exists())
+
+
+class CachedResponseTests(TestCase):
+    """``pet.cache.cached_response`` and its rebuild lock."""
+
+    def setUp(self):
+        cache.clear()
+        self.request = Request(APIRequestFactory().get("/api/v1/pets/", {"q": "x"}))
+        self.builds = 0
+
+    def build(self, status=200):
+        def build_response():
+            self.builds += 1
+            return Response({"built": self.builds}, status=status)
+
+        return build_response
+
+    def test_hit_skips_the_build_and_the_database(self):
+        cached_response(self.request, "list", self.build())
+        with self.assertNumQueries(0):
+            response = cached_response(self.request, "list", self.build())
+        self.assertEqual(response.data, {"built": 1})
+        self.assertEqual(self.builds, 1)
+        self.assertIsNone(cache.get(f"{get_cache_key(self.request, 'list')}:lock"))
+
+    def test_version_bump_misses(self):
+        cached_response(self.request, "list", self.build())
+        bump_catalog_version()
+        response = cached_response(self.request, "list", self.build())
+        self.assertEqual(response.data, {"built": 2})
+
+    def test_errors_are_not_stored(self):
+        cached_response(self.request, "list", self.build(status=404))
+        cached_response(self.request, "list", self.build())
+        self.assertEqual(self.builds, 2)
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        key = get_cache_key(self.request, "list")
+        cache.add(f"{key}:lock", 1)
+
+        def other_worker_finishes(seconds):
+            cache.set(key, {"built": "elsewhere"})
+
+        with mock.patch("pet.cache.time.sleep", side_effect=other_worker_finishes):
+            response = cached_response(self.request, "list", self.build())
+        self.assertEqual(response.data, {"built": "elsewhere"})
+        self.assertEqual(self.builds, 0)
+
+    def test_builds_when_the_lock_is_released_without_a_result(self):
+        key = get_cache_key(self.request, "list")
+        cache.add(f"{key}:lock", 1)
+
+        def other_worker_fails(seconds):
+            cache.delete(f"{key}:lock")
+
+        with mock.patch("pet.cache.time.sleep", side_effect=other_worker_fails):
+            response = cached_response(self.request, "list", self.build())
+        self.assertEqual(response.data, {"built": 1})
+
+    def test_builds_when_the_lock_holder_is_too_slow(self):
+        key = get_cache_key(self.request, "list")
+        cache.add(f"{key}:lock", 1)
+        with mock.patch("pet.cache.time.sleep") as sleep:
+            response = cached_response(self.request, "list", self.build())
+        self.assertEqual(response.data, {"built": 1})
+        self.assertEqual(sleep.call_count, REBUILD_WAIT_ATTEMPTS)
+        # The lock belongs to the other worker.
+        self.assertIsNotNone(cache.get(f"{key}:lock"))
+
+    def test_warm_anonymous_list_makes_no_query(self):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        make_pets(3, owner, Category.objects.create(name="Dog"))
+        client = APIClient()
+        client.get("/api/v1/pets/")
+        with self.assertNumQueries(0):
+            response = client.get("/api/v1/pets/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+class PetRetrieveColumnsTests(TestCase):
+    """``retrieve`` only loads the columns of the requested fields."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="owner", email="owner@example.com")
+        (cls.pet,) = make_pets(1, cls.owner, Category.objects.create(name="Dog"))
+
+    def setUp(self):
+        pet_view_counter.reset()
+        self.addCleanup(pet_view_counter.reset)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def retrieve(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/v1/pets/{self.pet.pk}/", params)
+        self.assertEqual(response.status_code, 200)
+        (select,) = [q["sql"] for q in queries if '"pet_pet"' in q["sql"]]
+        return response.data, select
+
+    def test_sparse_fields(self):
+        data, select = self.retrieve(fields="id,name")
+        self.assertEqual(data, {"id": str(self.pet.pk), "name": self.pet.name})
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('"search_vector"', select)
+        self.assertNotIn('"user_customuser"."email"', select)
+
+    def test_full_representation_is_unchanged(self):
+        data, select = self.retrieve()
+        expected = pet_serializers.PetSerializer(
+            Pet.objects.select_related("category", "owner").get(pk=self.pet.pk)
+        ).data
+        self.assertEqual(data, expected)
+        self.assertNotIn('"search_vector"', select)
+
+    def test_hidden_pet_still_checks_the_owner(self):
+        Pet.objects.filter(pk=self.pet.pk).update(status=Pet.PENDING)
+        self.client.force_authenticate(None)
+        response = self.client.get(f"/api/v1/pets/{self.pet.pk}/", {"fields": "name"})
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(f"/api/v1/pets/{self.pet.pk}/", {"fields": "name"})
+        self.assertEqual(response.status_code, 200)
+
+
+class PetFacetTests(TestCase):
+    """Facet counts match plain ``Count`` queries over the same pets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        dog = Category.objects.create(name="Dog")
+        cat = Category.objects.create(name="Cat")
+        make_pets(23, owner, dog)
+        make_pets(11, owner, cat, breed="persian")
+        make_pets(4, owner, None, breed="mixed", name="stray")
+        rng = random.Random(0)
+        pets = list(Pet.objects.all())
+        for pet in pets:
+            pet.fees = rng.choice([0, 25, 50, 75, 99.5, 100, 150, 200, 350])
+            pet.age = rng.randrange(0, 15)
+        Pet.objects.bulk_update(pets, ["fees", "age"])
+
+    def expected(self, queryset):
+        def grouped(field):
+            rows = queryset.order_by().values_list(field).annotate(n=Count("pk"))
+            return {value: count for value, count in rows}
+
+        def banded(field, bands):
+            counts, lower = {}, None
+            for label, upper in bands:
+                band = queryset
+                if lower is not None:
+                    band = band.filter(**{f"{field}__gte": lower})
+                if upper is not None:
+                    band = band.filter(**{f"{field}__lt": upper})
+                counts[label] = band.count()
+                lower = upper
+            return counts
+
+        return {
+            "category": grouped("category__name"),
+            "breed": grouped("breed"),
+            "fees": banded("fees", FEE_BANDS),
+            "age": banded("age", AGE_BANDS),
+        }
+
+    def assertFacets(self, facets, queryset):
+        actual = {
+            name: {item["value"]: item["count"] for item in items}
+            for name, items in facets.items()
+        }
+        expected = self.expected(queryset)
+        for name in ("fees", "age"):
+            self.assertEqual(actual[name], expected[name], name)
+        for name in ("category", "breed"):
+            self.assertEqual(actual[name], expected[name], name)
+            counts = [item["count"] for item in facets[name]]
+            self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_counts_under_filters(self):
+        querysets = [
+            Pet.objects.all(),
+            Pet.objects.filter(category__name="Dog"),
+            Pet.objects.filter(fees__gt=60, age__lt=9),
+            Pet.objects.filter(category__isnull=True),
+            Pet.objects.filter(name__contains="stray", fees__lt=100),
+            Pet.objects.none(),
+            Pet.objects.filter(pk__in=[]),
+        ]
+        for index, queryset in enumerate(querysets):
+            with self.subTest(index=index):
+                self.assertFacets(pet_facet_counts(queryset), queryset)
+
+    def test_one_query(self):
+        with self.assertNumQueries(1):
+            pet_facet_counts(Pet.objects.filter(fees__gt=10))
+
+    def test_endpoint_applies_the_list_filters(self):
+        cache.clear()
+        response = APIClient().get(
+            "/api/v1/pets/facets/", {"category__name": "Cat", "fees__gt": 50}
+        )
+        self.assertEqual(response.status_code, 200)
+        queryset = Pet.objects.filter(
+            status=Pet.APPROVED,
+            visibility=Pet.PUBLIC,
+            category__name="Cat",
+            fees__gt=50,
+        )
+        self.assertFacets(response.data, queryset)
+
+    def test_grouping_masks(self):
+        masks = grouping_masks()
+        self.assertEqual(set(masks.values()), set(FACETS))
+        columns = list(FACETS.values())
+        for mask, name in masks.items():
+            # Only the bit of the facet's own column is clear.
+            grouped = [
+                column
+                for index, column in enumerate(columns)
+                if not mask & (1 << (len(columns) - 1 - index))
+            ]
+            self.assertEqual(grouped, [FACETS[name]])
+
+
+class PetViewCounterTests(TestCase):
+    """Buffered pet views are written in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner", email="owner@example.com")
+        cls.pets = make_pets(3, owner, Category.objects.create(name="Dog"))
+
+    def setUp(self):
+        self.counter = PetViewCounter()
+        self.addCleanup(self.counter.reset)
+
+    def views(self):
+        pks = [pet.pk for pet in self.pets]
+        return list(
+            Pet.objects.filter(pk__in=pks)
+            .order_by("pk")
+            .values_list("views", flat=True)
+        )
+
+    def test_views_are_batched(self):
+        first, second, third = sorted(self.pets, key=lambda pet: pet.pk)
+        with self.assertNumQueries(0):
+            for pk in [first.pk] * 3 + [second.pk] * 3 + [third.pk]:
+                self.counter.record(pk)
+        self.assertEqual(self.counter.stats()["pending_views"], 7)
+
+        version = get_views_version()
+        # One UPDATE per distinct increment, a single one on PostgreSQL.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.counter.flush(), 3)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1 if connection.vendor == "postgresql" else 2)
+        self.assertEqual(self.views(), [3, 3, 1])
+        self.assertNotEqual(get_views_version(), version)
+        self.assertEqual(self.counter.stats()["pending_views"], 0)
+
+    def test_first_view_starts_the_flush_timer(self):
+        with mock.patch("pet.counters.threading.Timer") as timer:
+            self.counter.record(self.pets[0].pk)
+            self.counter.record(self.pets[1].pk)
+        timer.assert_called_once_with(30, self.counter._flush_on_timer)
+        timer.return_value.start.assert_called_once_with()
+
+        self.counter.flush()
+        timer.return_value.cancel.assert_called_once_with()
+
+    def test_timer_flushes(self):
+        # The timer thread has its own connection, outside the test transaction.
+        with mock.patch("pet.counters.write_pet_views") as write:
+            with self.settings(PET_VIEW_FLUSH_INTERVAL=0.01):
+                self.counter.record(self.pets[0].pk)
+            timer = self.counter.timer
+            timer.join(5)
+        write.assert_called_once_with({self.pets[0].pk: 1})
+        self.assertIsNone(self.counter.timer)
+        self.assertEqual(self.counter.stats()["flushes"], 1)
+
+    def test_write_through_without_interval(self):
+        with self.settings(PET_VIEW_FLUSH_INTERVAL=0):
+            self.counter.record(self.pets[0].pk)
+        self.assertIsNone(self.counter.timer)
+        self.assertEqual(sorted(self.views()), [0, 0, 1])
+
+    def test_flush_when_too_many_pets_are_pending(self):
+        with mock.patch("pet.counters.VIEW_FLUSH_MAX_PETS", 2):
+            self.counter.record(self.pets[0].pk)
+            self.assertEqual(self.counter.stats()["flushes"], 0)
+            self.counter.record(self.pets[1].pk)
+        self.assertEqual(self.counter.stats()["flushes"], 1)
+        self.assertEqual(sorted(self.views()), [0, 1, 1])
+
+    def test_failed_flush_keeps_the_views(self):
+        self.counter.record(self.pets[0].pk)
+        with mock.patch(
+            "pet.counters.write_pet_views", side_effect=DatabaseError
+        ), self.assertLogs("pet.counters", "ERROR"):
+            self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(self.counter.stats()["pending_views"], 1)
+        self.assertEqual(self.counter.stats()["failed_flushes"], 1)
+
+        self.counter.flush()
+        self.assertEqual(sorted(self.views()), [0, 0, 1])
+
+    def test_reset_drops_the_views(self):
+        self.counter.record(self.pets[0].pk)
+        self.counter.reset()
+        self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(self.views(), [0, 0, 0])
+
+    @skipUnless(connection.vendor == "postgresql", "needs PostgreSQL")
+    def test_postgres_writes_one_update(self):
+        counts = {pet.pk: index + 1 for index, pet in enumerate(self.pets)}
+        with self.assertNumQueries(1):
+            write_pet_views(counts)
+        for pet in Pet.objects.filter(pk__in=counts):
+            self.assertEqual(pet.views, counts[pet.pk])
+
+    def test_write_pet_views(self):
+        counts = {pet.pk: index + 1 for index, pet in enumerate(self.pets)}
+        write_pet_views(counts)
+        write_pet_views(counts)
+        for pet in Pet.objects.filter(pk__in=counts):
+            self.assertEqual(pet.views, 2 * counts[pet.pk])
@@ -1,26 +1,59 @@
 from functools import partial
 from rest_framework import viewsets, permissions, mixins, status
 from rest_framework import serializers
-from pet.fitlers import AdoptionHistoryFilter, PetFilter
+from rest_framework.parsers import JSONParser
+from api.cache import get_version
+from api.mixins import ConditionalGetMixin, IdempotentCreateMixin, ValuesListMixin
+from api.parsers import NDJSONParser
+from pet.cache import (
+    CATALOG_VERSION_KEY,
+    REVIEWS_VERSION_KEY,
+    cached_response,
+    invalidate_catalog,
+    pet_version_key,
+)
+from pet.counters import VIEWS_VERSION_KEY, get_views_version, pet_view_counter
+from pet.facets import pet_facet_counts
+from pet.fitlers import AdoptionHistoryFilter, PetFilter, PetSearchFilter
 from pet.paginations import AdoptionHistoryPagination, PetsPagination
 from pet.models import Pet, Adoption
+from pet.moderation import transition_pets
+from pet.search import refresh_search_vectors
+from pet.similarity import similar_pet_index
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from pet import serializers as pet_serializers
+from payment.models import PaymentHistory
+from payment.serializers import PaymentAdminHistorySerializer, PaymentHistorySerializer
+from review.models import Review
+from review.serializers import ReviewSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from drf_yasg.utils import swagger_auto_schema
 
 
-class PetViewSet(viewsets.ModelViewSet):
+class PetViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     swagger_tags = ["pets"]
     pagination_class = PetsPagination
     http_method_names = ["get", "post", "patch", "delete", "head", "options", "trace"]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PetSearchFilter, OrderingFilter]
     filterset_class = PetFilter
-    search_fields = ["name", "category__name", "fees"]
-    ordering_fields = ["fees", "updated_at"]
+    search_fields = ["name", "breed", "description", "category__name"]
+    ordering_fields = [
+        "fees",
+        "updated_at",
+        "views",
+        "review_count",
+        "latest_review_at",
+    ]
+    values_actions = ["list", "my_pet", "adopted"]
+    # Read by _retrieve to decide who may see the pet.
+    only_required_fields = ["status", "owner"]
+    bulk_max_items = 10000
+    include_limit = 10
+    bulk_batch_size = 500
 
     @swagger_auto_schema(
         operation_summary="List my pets",
@@ -35,6 +68,9 @@ class PetViewSet(viewsets.ModelViewSet):
         queryset = self.filter_queryset(
             Pet.objects.select_related("category", "owner").filter(owner=request.user)
         )
+        response = self.get_values_response(queryset)
+        if response is not None:
+            return response
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -60,6 +96,9 @@ class PetViewSet(viewsets.ModelViewSet):
                 adopted_by=request.user
             )
         )
+        response = self.get_values_response(queryset)
+        if response is not None:
+            return response
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -69,34 +108,290 @@ class PetViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @swagger_auto_schema(
+        operation_summary="Bulk import pet listings",
+        operation_description=(
+            "Create many pet listings in one request.\n\n"
+            "- Requires authentication.\n"
+            "- Accepts a JSON array or an NDJSON body (`application/x-ndjson`).\n"
+            "- Valid items are inserted in one transaction, invalid ones are "
+            "reported by their index."
+        ),
+        request_body=pet_serializers.PetBulkSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request, pk=None):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"details": "Expected a JSON array or NDJSON body."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.bulk_max_items:
+            return Response(
+                {"details": f"At most {self.bulk_max_items} pets per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        context = self.get_serializer_context()
+        context["categories"] = pet_serializers.PetBulkSerializer.load_categories(items)
+        serializer = pet_serializers.PetBulkSerializer(context=context)
+
+        pets, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                validated_data = serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+                continue
+            pets.append(Pet(owner=request.user, **validated_data))
+
+        with transaction.atomic():
+            for start in range(0, len(pets), self.bulk_batch_size):
+                batch = pets[start : start + self.bulk_batch_size]
+                Pet.objects.bulk_create(batch)
+                refresh_search_vectors(batch)
+            if pets:
+                invalidate_catalog()
+
+        return Response(
+            {"created": len(pets), "errors": errors},
+            status=(
+                status.HTTP_201_CREATED
+                if pets or not errors
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Pet catalog facet counts",
+        operation_description=(
+            "Count the listed pets per category, breed, fee band and age band.\n\n"
+            "- Accepts the same filter and search parameters as the pet list.\n"
+            "- All counts come from one grouped query and are cached until the "
+            "catalog changes."
+        ),
+    )
+    @action(detail=False, methods=["get"])
+    def facets(self, request, pk=None):
+        user = request.user
+        prefix = "facets:staff" if user.is_authenticated and user.is_staff else "facets"
+        return cached_response(
+            request,
+            prefix,
+            lambda: Response(
+                pet_facet_counts(self.filter_queryset(self.get_queryset())),
+                status=status.HTTP_200_OK,
+            ),
+        )
+
+    @swagger_auto_schema(
+        operation_summary="List similar pets",
+        operation_description=(
+            "Retrieve approved public pets most similar to the given one.\n\n"
+            "- Similarity combines category, breed, age, fees and description "
+            "terms.\n"
+            "- `limit` sets how many pets are returned (default 10, max 50)."
+        ),
+    )
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        pet = self.get_object()
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 50))
+        except ValueError:
+            limit = 10
+
+        # Over-fetch since the in-memory index may still hold pets that were
+        # deleted or changed in another process.
+        ids = similar_pet_index.similar_ids(pet, limit * 2)
+        pets = Pet.objects.select_related("category", "owner").in_bulk(
+            ids, field_name="pk"
+        )
+        ordered = [
+            pets[pk]
+            for pk in ids
+            if pk in pets
+            and pets[pk].status == Pet.APPROVED
+            and pets[pk].visibility == Pet.PUBLIC
+        ][:limit]
+
+        serializer = self.get_serializer(ordered, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Pet view counter stats",
+        operation_description=(
+            "Buffered pet view counters of the process serving the request.\n\n"
+            "- Views are buffered in memory and written in batches; this reports "
+            "the pending buffer and flush latency.\n"
+            "- Only admins can access this endpoint."
+        ),
+    )
+    @action(detail=False, methods=["get"], url_path="view-stats")
+    def view_stats(self, request, pk=None):
+        return Response(pet_view_counter.stats(), status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_summary="Bulk moderate pets",
+        operation_description=(
+            "Move many pets to `approved`, `suspended` or `withdrawn` at once.\n\n"
+            "- Only admins are allowed to moderate pets.\n"
+            "- Select pets with `ids`, a `filter` using the pet list filters, or "
+            "both.\n"
+            "- Pets whose current status does not allow the transition are left "
+            "unchanged; the response reports how many were updated."
+        ),
+        request_body=pet_serializers.PetModerationSerializer,
+    )
+    @action(detail=False, methods=["post"])
+    def moderate(self, request, pk=None):
+        serializer = pet_serializers.PetModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        queryset = Pet.objects.all()
+        if "filter" in data:
+            filterset = PetFilter(data=data["filter"], queryset=queryset)
+            if not filterset.is_valid():
+                raise serializers.ValidationError({"filter": filterset.errors})
+            queryset = filterset.qs
+
+        updated = transition_pets(queryset, data["status"], ids=data.get("ids"))
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
         operation_summary="Retrieve pet details",
         operation_description=(
             "Retrieve details of a specific pet by ID.\n\n"
             "- **Owner or Admin**: Can always access their pet listing.\n"
             "- **Other users**: Can view details only if the pet is approved and public.\n"
-            "- Returns 404 if access is restricted."
+            "- Returns 404 if access is restricted.\n\n"
+            "Use `?include=reviews,adoptions,payments` to embed the newest related "
+            "records in the same response. Adoptions are admin only and non-admin "
+            "users only get their own payments."
         ),
     )
     def retrieve(self, request, *args, **kwargs):
+        if not request.user.is_authenticated and not self.get_includes():
+            version = get_version(pet_version_key(kwargs["pk"]))
+            response = cached_response(
+                request,
+                f"retrieve:{version}",
+                lambda: self._retrieve(request, *args, **kwargs),
+            )
+        else:
+            response = self._retrieve(request, *args, **kwargs)
+
+        if response.status_code == status.HTTP_200_OK:
+            pet_view_counter.record(kwargs["pk"])
+        return response
+
+    def _retrieve(self, request, *args, **kwargs):
         pet = self.get_object()
         user = request.user
-        print(user.is_staff)
-        if (pet.owner == user) or (user.is_authenticated and user.is_staff):
-            serializers = self.get_serializer(pet)
-            return Response(serializers.data, status=status.HTTP_200_OK)
-
-        if pet.status == Pet.APPROVED:
-            serializers = self.get_serializer(pet)
-            return Response(serializers.data, status=status.HTTP_200_OK)
+        is_admin = user.is_authenticated and user.is_staff
+        is_owner = user.is_authenticated and pet.owner_id == user.pk
+        if not (is_owner or is_admin or pet.status == Pet.APPROVED):
+            return Response({"details": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        data = self.get_serializer(pet).data
+        includes = self.get_includes()
+        prefetch_related_objects([pet], *self.get_include_prefetches(includes))
+        # ?fields= and ?omit= only pick the fields of the pet itself.
+        context = {**self.get_serializer_context(), "sparse_fieldsets": False}
+        if "reviews" in includes:
+            data["reviews"] = ReviewSerializer(
+                pet.included_reviews, many=True, context=context
+            ).data
+        if "adoptions" in includes:
+            data["adoptions"] = pet_serializers.AdoptionHistorySerializer(
+                pet.included_adoptions, many=True, context=context
+            ).data
+        if "payments" in includes:
+            payment_serializer_class = (
+                PaymentAdminHistorySerializer if is_admin else PaymentHistorySerializer
+            )
+            data["payments"] = payment_serializer_class(
+                pet.included_payments, many=True, context=context
+            ).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    def get_includes(self):
+        """
+        Related collections requested with ``?include=`` on retrieve that the
+        user may see: reviews for everyone, payments for authenticated users
+        (their own unless admin) and adoptions for admins.
+        """
+        if self.action != "retrieve":
+            return set()
 
-        return Response({"details": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        user = self.request.user
+        allowed = {"reviews"}
+        if user.is_authenticated:
+            allowed.add("payments")
+            if user.is_staff:
+                allowed.add("adoptions")
+
+        requested = self.request.query_params.get("include", "")
+        return allowed.intersection(name.strip() for name in requested.split(","))
+
+    def get_include_prefetches(self, includes):
+        # Sliced prefetches fetch the newest rows of each collection in one
+        # query apiece, so the query count does not depend on their size.
+        limit = self.include_limit
+        prefetches = []
+        if "reviews" in includes:
+            reviews = Review.objects.select_related("reviewer").order_by("-created_at")
+            prefetches.append(
+                Prefetch("reviews", reviews[:limit], to_attr="included_reviews")
+            )
+        if "adoptions" in includes:
+            adoptions = Adoption.objects.select_related("adopted_by").order_by("-date")
+            prefetches.append(
+                Prefetch(
+                    "adoption_history", adoptions[:limit], to_attr="included_adoptions"
+                )
+            )
+        if "payments" in includes:
+            payments = PaymentHistory.objects.select_related("pet__category").order_by(
+                "-created_at"
+            )
+            user = self.request.user
+            if not user.is_staff:
+                payments = payments.filter(user=user)
+            prefetches.append(
+                Prefetch(
+                    "payment_histories", payments[:limit], to_attr="included_payments"
+                )
+            )
+        return prefetches
+
+    def get_etag(self):
+        if self.get_includes():
+            # Included collections change without bumping the catalog.
+            return None
+        return super().get_etag()
+
+    def get_version_keys(self):
+        # Bumped by every pet, category and adoption change, by flushed view
+        # counts and by reviews of the listed or retrieved pets.
+        if self.action == "retrieve":
+            reviews_key = pet_version_key(self.kwargs["pk"])
+        else:
+            reviews_key = REVIEWS_VERSION_KEY
+        return [CATALOG_VERSION_KEY, VIEWS_VERSION_KEY, reviews_key]
 
     def get_permissions(self):
         if self.action in ["my_pet"]:
             return [permissions.IsAuthenticated()]
 
-        if self.action in ["partial_update", "destroy"]:
+        if self.action in ["partial_update", "destroy", "moderate", "view_stats"]:
             return [permissions.IsAdminUser()]
 
         return [permissions.IsAuthenticatedOrReadOnly()]
@@ -136,10 +431,24 @@ class PetViewSet(viewsets.ModelViewSet):
             "Retrieve a list of pets.\n\n"
             "- **Admins**: Can view all pets.\n"
             "- **Regular users**: Only see pets with approved status and public visibility.\n"
-            "- Supports filtering, search, ordering, and pagination."
+            "- Supports filtering, search, ordering, and pagination.\n"
+            "- `?ordering=-views` sorts by popularity; view counts are written "
+            "in batches and may lag by a few seconds.\n"
+            "- Pass `?cursor=` to switch to keyset pagination (no count, "
+            "opaque `next`/`previous` cursors)."
         ),
     )
     def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            prefix = f"list:reviews:{get_version(REVIEWS_VERSION_KEY)}"
+            if "views" in request.query_params.get("ordering", ""):
+                # Keep the order in step with the flushed view counts.
+                prefix = f"{prefix}:views:{get_views_version()}"
+            return cached_response(
+                request,
+                prefix,
+                lambda: super(PetViewSet, self).list(request, *args, **kwargs),
+            )
         return super().list(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -175,6 +484,7 @@ class PetViewSet(viewsets.ModelViewSet):
 
 
 class AdoptionHistoryViewSet(
+    IdempotentCreateMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -199,13 +509,9 @@ class AdoptionHistoryViewSet(
         )
 
     def perform_create(self, serializer):
-        user = self.request.user
-        pet = serializer.context["pet_instance"]
-
-        with transaction.atomic():
-            user.balance -= pet.fees  # type: ignore
-            user.save(update_fields=["balance"])  # type: ignore
-            serializer.save(pet_id=pet.pk, adopted_by=self.request.user)
+        # Claiming the pet, debiting the fees and recording the adoption
+        # happen in one transaction, see pet.adoption.adopt_pet.
+        serializer.save(pet_id=self.kwargs.get("pets_pk"), adopted_by=self.request.user)
 
     @swagger_auto_schema(
         operation_summary="List adoption histories",
@@ -234,7 +540,9 @@ class AdoptionHistoryViewSet(
             "Create a new adoption history entry for a pet.\n\n"
             "- Requires authentication.\n"
             "- Automatically deducts the adoption fees from the adopter's balance.\n"
-            "- Links the adoption record with the pet and the adopting user."
+            "- Links the adoption record with the pet and the adopting user.\n"
+            "- Send an `Idempotency-Key` header to make retries safe: the first "
+            "successful response is stored for 24 hours and replayed for the same key."
         ),
     )
     def create(self, request, *args, **kwargs):
@@ -0,0 +1,83 @@
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from pet.cache import invalidate_pet_reviews
+from pet.models import Pet
+from review.models import Review
+
+REPAIR_BATCH_SIZE = 1000
+
+
+def add_review(review):
+    """Count a new review on its pet with a single ``F()`` update."""
+    created_at = Value(review.created_at)
+    Pet.objects.filter(pk=review.pet_id).update(
+        review_count=F("review_count") + 1,
+        latest_review_at=Greatest(Coalesce("latest_review_at", created_at), created_at),
+    )
+    invalidate_pet_reviews(review.pet_id)
+
+
+def remove_review(review):
+    """
+    Uncount a deleted review. ``latest_review_at`` is only looked up again
+    when the deleted review was the latest one.
+    """
+    latest = (
+        Review.objects.filter(pet=OuterRef("pk"))
+        .order_by("-created_at")
+        .values("created_at")[:1]
+    )
+    Pet.objects.filter(pk=review.pet_id, review_count__gt=0).update(
+        review_count=F("review_count") - 1,
+        latest_review_at=Case(
+            When(latest_review_at__lte=review.created_at, then=Subquery(latest)),
+            default=F("latest_review_at"),
+        ),
+    )
+    invalidate_pet_reviews(review.pet_id)
+
+
+def repair_review_aggregates(pet_ids, dry_run=False):
+    """
+    Recompute the review aggregates of ``pet_ids`` from their reviews.
+    Returns the ids of the pets whose counters had drifted.
+    """
+    actual = {
+        row["pet_id"]: (row["reviews"], row["latest"])
+        for row in Review.objects.filter(pet_id__in=pet_ids)
+        .order_by()
+        .values("pet_id")
+        .annotate(reviews=Count("pk"), latest=Max("created_at"))
+    }
+    drifted = []
+    for pet in Pet.objects.filter(pk__in=pet_ids).only(
+        "pk", "review_count", "latest_review_at"
+    ):
+        review_count, latest_review_at = actual.get(pet.pk, (0, None))
+        if (pet.review_count, pet.latest_review_at) != (
+            review_count,
+            latest_review_at,
+        ):
+            pet.review_count = review_count
+            pet.latest_review_at = latest_review_at
+            drifted.append(pet)
+
+    if drifted and not dry_run:
+        Pet.objects.bulk_update(drifted, ["review_count", "latest_review_at"])
+        invalidate_pet_reviews(*[pet.pk for pet in drifted])
+    return [pet.pk for pet in drifted]
+
+
+def iter_pet_batches(batch_size=REPAIR_BATCH_SIZE):
+    """Yield lists of pet ids in primary key order without loading pets."""
+    last = None
+    while True:
+        queryset = Pet.objects.order_by("pk")
+        if last is not None:
+            queryset = queryset.filter(pk__gt=last)
+        batch = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
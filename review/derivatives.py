@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from review.imaging import render_derivative
+from review.models import Review
+from review.storage import get_image_storage
+
+# Longest side in pixels of each derivative.
+DERIVATIVE_SIZES = {"small": 320, "medium": 800}
+DERIVATIVE_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def derivative_name(source_hash, size, fmt):
+    """Content address of a derivative: the source hash plus its parameters."""
+    return f"{source_hash[:2]}/{source_hash}-{DERIVATIVE_SIZES[size]}.{fmt}"
+
+
+def derivative_path(source_hash, size, fmt):
+    return os.path.join(
+        settings.REVIEW_IMAGE_DERIVATIVE_DIR, derivative_name(source_hash, size, fmt)
+    )
+
+
+def derivative_exists(source_hash, size, fmt):
+    """Whether the derivative was generated or a stored image can build it."""
+    if os.path.exists(derivative_path(source_hash, size, fmt)):
+        return True
+    return Review.objects.filter(
+        image_hash=source_hash, image_status=Review.IMAGE_READY
+    ).exists()
+
+
+class DerivativeGenerator:
+    """
+    Builds derivatives the first time they are requested.
+
+    Decoding and resizing run in a process pool so they neither hold the GIL
+    of the web process nor block other requests. Concurrent requests for the
+    same derivative share one job. Finished files are never rewritten, since
+    their name changes with the source.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.executor = None
+        self.jobs = {}
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                # Forking a threaded server process is unsafe; the workers
+                # only import review.imaging, which does not need Django.
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                    or settings.REVIEW_IMAGE_DERIVATIVE_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                )
+            return self.executor
+
+    def get(self, source_hash, size, fmt):
+        """
+        Return the path of the derivative, generating it if needed, or None
+        when no stored image has ``source_hash``.
+        """
+        path = derivative_path(source_hash, size, fmt)
+        if os.path.exists(path):
+            return path
+
+        with self.lock:
+            job = self.jobs.get(path)
+            owner = job is None
+            if owner:
+                job = self.jobs[path] = threading.Event()
+        if not owner:
+            job.wait()
+            return path if os.path.exists(path) else None
+
+        try:
+            return self.generate(source_hash, size, fmt, path)
+        finally:
+            with self.lock:
+                del self.jobs[path]
+            job.set()
+
+    def generate(self, source_hash, size, fmt, path):
+        name = (
+            Review.objects.filter(
+                image_hash=source_hash, image_status=Review.IMAGE_READY
+            )
+            .values_list("image", flat=True)
+            .first()
+        )
+        if not name:
+            return None
+
+        data = get_image_storage().open(name)
+        rendered = (
+            self.get_executor()
+            .submit(render_derivative, data, DERIVATIVE_SIZES[size], fmt)
+            .result()
+        )
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        with open(partial, "wb") as destination:
+            destination.write(rendered)
+        os.replace(partial, path)
+        return path
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+derivative_generator = DerivativeGenerator()
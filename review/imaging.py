@@ -0,0 +1,37 @@
+"""
+Pillow work for review image derivatives. Runs in worker processes, so it
+must not import Django.
+"""
+
+import io
+
+from PIL import Image, ImageOps
+
+PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+QUALITY = 80
+
+
+def render_derivative(data, max_side, fmt):
+    """
+    Resize image bytes to fit ``max_side`` and encode them as ``fmt``. Runs
+    in the derivative process pool, so it only takes and returns bytes.
+    """
+    image = Image.open(io.BytesIO(data))
+    # Lets the JPEG decoder skip most of the pixels of large photos.
+    image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    pil_format = PIL_FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode != "RGB":
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+    output = io.BytesIO()
+    image.save(output, pil_format, quality=QUALITY, optimize=True)
+    return output.getvalue()
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate_model
+from review.models import Review
+from review.storage import get_image_storage
+from review.uploads import store_review_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Store review images still waiting in the upload spool, such as uploads "
+        "queued by a process that stopped before finishing them. Only spool "
+        "files on this host or on a shared REVIEW_IMAGE_SPOOL_DIR can be "
+        "stored; reviews whose file is missing are marked failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also retry images whose upload failed.",
+        )
+        parser.add_argument(
+            "--backfill-hashes",
+            action="store_true",
+            help=(
+                "Download stored images without a content hash, so they get "
+                "thumbnails too."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        statuses = [Review.IMAGE_PENDING]
+        if options["retry_failed"]:
+            statuses.append(Review.IMAGE_FAILED)
+
+        pending = (
+            Review.objects.filter(image_status__in=statuses)
+            .exclude(image_spool="")
+            .values_list("pk", "image_spool")
+        )
+        results = {}
+        for review_id, spool in pending.iterator():
+            status = store_review_image(review_id, spool)
+            results[status] = results.get(status, 0) + 1
+        self.stdout.write(
+            f"Stored {results.get(Review.IMAGE_READY, 0)} review image(s), "
+            f"{results.get(Review.IMAGE_FAILED, 0)} failed."
+        )
+
+        if options["backfill_hashes"]:
+            self.backfill_hashes()
+
+    def backfill_hashes(self):
+        storage = get_image_storage()
+        missing = (
+            Review.objects.filter(image_hash__isnull=True, image__isnull=False)
+            .exclude(image="")
+            .values_list("pk", "image")
+        )
+        hashed = 0
+        for review_id, name in missing.iterator():
+            try:
+                data = storage.open(name)
+            except Exception as exc:
+                self.stderr.write(
+                    f"Could not read the image of review {review_id}: {exc}"
+                )
+                continue
+            hashed += Review.objects.filter(pk=review_id, image=name).update(
+                image_hash=hashlib.sha256(data).hexdigest()
+            )
+        if hashed:
+            invalidate_model(Review)
+        self.stdout.write(f"Hashed {hashed} stored review image(s).")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from review.aggregates import (
+    REPAIR_BATCH_SIZE,
+    iter_pet_batches,
+    repair_review_aggregates,
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute Pet.review_count and Pet.latest_review_at from the reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REPAIR_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the pets whose aggregates drifted.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for pet_ids in iter_pet_batches(options["batch_size"]):
+            drifted += len(repair_review_aggregates(pet_ids, options["dry_run"]))
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(f"{verb} {drifted} pet(s) with drifted review aggregates.")
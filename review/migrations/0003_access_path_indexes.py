@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0009_access_path_indexes'),
+        ('review', '0002_remove_review_images_review_image_delete_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pet', 'reviewer'], name='review_pet_reviewer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pet', 'created_at'], name='review_pet_created_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_images_ready(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    Review.objects.exclude(image__isnull=True).exclude(image='').update(
+        image_status='ready'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0011_pet_review_aggregates'),
+        ('review', '0003_access_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='image_spool',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('pending', 'pending'), ('ready', 'ready'), ('failed', 'failed')], max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='image',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('image_status__in', ['pending', 'failed'])), fields=['image_status'], name='review_image_pending_idx'),
+        ),
+        migrations.RunPython(mark_existing_images_ready, migrations.RunPython.noop),
+    ]
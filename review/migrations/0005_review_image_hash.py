@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pet', '0011_pet_review_aggregates'),
+        ('review', '0004_review_image_upload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='image_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['image_hash'], name='review_image_hash_idx'),
+        ),
+    ]
@@ -1,22 +1,51 @@
 import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
-from cloudinary.models import CloudinaryField
 from pet.models import Pet
 
 User = get_user_model()
 
 
 class Review(models.Model):
+    IMAGE_PENDING = "pending"
+    IMAGE_READY = "ready"
+    IMAGE_FAILED = "failed"
+
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PENDING, "pending"),
+        (IMAGE_READY, "ready"),
+        (IMAGE_FAILED, "failed"),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     comments = models.TextField()
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name="reviews")
     reviewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
 
-    image = CloudinaryField("image", blank=True, null=True)
+    # Name of the image in the review image storage, see review/storage.py.
+    image = models.CharField(max_length=255, blank=True, null=True)
+    image_status = models.CharField(
+        max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True, null=True
+    )
+    # SHA-256 of the stored image, the content address of its derivatives.
+    image_hash = models.CharField(max_length=64, blank=True, null=True)
+    # Spooled upload still waiting for review/uploads.py to store it.
+    image_spool = models.CharField(max_length=255, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["pet", "reviewer"], name="review_pet_reviewer_idx"),
+            models.Index(fields=["pet", "created_at"], name="review_pet_created_idx"),
+            models.Index(fields=["image_hash"], name="review_image_hash_idx"),
+            models.Index(
+                fields=["image_status"],
+                name="review_image_pending_idx",
+                condition=models.Q(image_status__in=["pending", "failed"]),
+            ),
+        ]
+
     def __str__(self):
         return f"Review by {self.reviewer}"
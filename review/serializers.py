@@ -1,6 +1,11 @@
 from urllib import request
 from rest_framework import serializers
+from api.serializers import SparseFieldsetMixin
 from pet.models import Pet
+from django.urls import reverse
+from review.derivatives import DERIVATIVE_FORMATS, DERIVATIVE_SIZES
+from review.storage import get_image_storage
+from review.uploads import review_image_uploader, spool_image
 from .models import Review
 from django.contrib.auth import get_user_model
 
@@ -13,19 +18,88 @@ class ReviewerSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ["name", "username"]
+        # Lets the values() list path call get_full_name without a model.
+        values_method_sources = {"name": ["first_name", "last_name"]}
 
     def get_full_name(self, user):
         return f"{user.first_name} {user.last_name}"
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField(required=False)
+class ReviewImageField(serializers.ImageField):
+    """Accepts an image upload and renders the stored image name as a URL."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return get_image_storage().url(value)
+
+
+class SpooledImageMixin:
+    """
+    Saves the review with the uploaded image left in the local spool and
+    marked pending; the upload pool stores it after the transaction commits.
+    """
+
+    def spool_image(self, validated_data):
+        image = validated_data.pop("image", None)
+        if image is not None:
+            validated_data["image_spool"] = spool_image(image)
+            validated_data["image_status"] = Review.IMAGE_PENDING
+        return image is not None
+
+    def create(self, validated_data):
+        spooled = self.spool_image(validated_data)
+        review = super().create(validated_data)
+        if spooled:
+            review_image_uploader.schedule(review)
+        return review
+
+    def update(self, instance, validated_data):
+        spooled = self.spool_image(validated_data)
+        review = super().update(instance, validated_data)
+        if spooled:
+            review_image_uploader.schedule(review)
+        return review
+
+
+class ReviewSerializer(
+    SpooledImageMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
+    image = ReviewImageField(required=False)
+    thumbnails = serializers.SerializerMethodField()
     reviewer = ReviewerSerializer(read_only=True)
 
     class Meta:
         model = Review
-        fields = ["id", "comments", "reviewer", "image", "created_at"]
-        read_only_fields = ["id", "reviewer", "created_at"]
+        fields = [
+            "id",
+            "comments",
+            "reviewer",
+            "image",
+            "image_status",
+            "thumbnails",
+            "created_at",
+        ]
+        read_only_fields = ["id", "reviewer", "image_status", "created_at"]
+        values_method_sources = {"thumbnails": ["image_hash"]}
+
+    def get_thumbnails(self, review):
+        """Derivative URLs by size and format, so lists never load originals."""
+        if not review.image_hash:
+            return None
+        request = self.context.get("request")
+        thumbnails = {}
+        for size in DERIVATIVE_SIZES:
+            thumbnails[size] = {}
+            for fmt in DERIVATIVE_FORMATS:
+                url = reverse(
+                    "review-images-derivative",
+                    kwargs={"source": review.image_hash, "size": size, "fmt": fmt},
+                )
+                thumbnails[size][fmt] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return thumbnails
 
     def validate(self, attrs):
         view = self.context.get("view")
@@ -47,12 +121,14 @@ class ReviewSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class ReviewUpdateSerializer(serializers.ModelSerializer):
-    image = serializers.ImageField(required=False)
+class ReviewUpdateSerializer(SpooledImageMixin, serializers.ModelSerializer):
+    image = ReviewImageField(required=False)
 
     class Meta:
         model = Review
         fields = [
             "comments",
             "image",
+            "image_status",
         ]
+        read_only_fields = ["image_status"]
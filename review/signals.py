@@ -0,0 +1,22 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save
+from api.cache import invalidate_model
+from review.aggregates import add_review, remove_review
+from review.models import Review
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, **kwargs):
+    if created:
+        add_review(instance)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    remove_review(instance)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, **kwargs):
+    invalidate_model(Review)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from urllib.request import urlopen
+
+from cloudinary import uploader
+from cloudinary.models import CloudinaryField
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class ImageStorage(ABC):
+    """
+    Where review images end up. ``save`` runs on the upload workers, never
+    on the request thread, and returns the name stored in ``Review.image``.
+    """
+
+    @abstractmethod
+    def save(self, path, filename):
+        """Store the file at ``path`` and return its name."""
+
+    @abstractmethod
+    def url(self, name):
+        pass
+
+    @abstractmethod
+    def open(self, name):
+        """Return the content of a stored image as bytes."""
+
+    @abstractmethod
+    def delete(self, name):
+        pass
+
+
+class CloudinaryImageStorage(ImageStorage):
+    """
+    Uploads to Cloudinary. Names use the ``resource_type/type/version/public_id``
+    format of ``CloudinaryField``, so images saved before the upload pipeline
+    keep working.
+    """
+
+    field = CloudinaryField("image")
+
+    def save(self, path, filename):
+        resource = uploader.upload_resource(path, resource_type="image")
+        return resource.get_prep_value()
+
+    def url(self, name):
+        return self.field.parse_cloudinary_resource(name).url
+
+    def open(self, name):
+        with urlopen(self.url(name), timeout=30) as response:
+            return response.read()
+
+    def delete(self, name):
+        uploader.destroy(self.field.parse_cloudinary_resource(name).public_id)
+
+
+class LocalImageStorage(ImageStorage):
+    """Keeps images on the local filesystem, for tests and development."""
+
+    def __init__(self, root=None, base_url=None):
+        self.root = root or settings.REVIEW_IMAGE_LOCAL_ROOT
+        self.base_url = base_url or settings.REVIEW_IMAGE_LOCAL_URL
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def save(self, path, filename):
+        extension = os.path.splitext(filename)[1].lower()
+        name = f"{uuid.uuid4().hex}{extension}"
+        os.makedirs(self.root, exist_ok=True)
+        shutil.copyfile(path, self.path(name))
+        return name
+
+    def url(self, name):
+        return f"{self.base_url.rstrip('/')}/{name}"
+
+    def open(self, name):
+        with open(self.path(name), "rb") as image:
+            return image.read()
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def get_image_storage():
+    """The storage named by the ``REVIEW_IMAGE_STORAGE`` setting."""
+    return import_string(settings.REVIEW_IMAGE_STORAGE)()
@@ -1,3 +1,341 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from category.models import Category
+from pet.cache import get_catalog_version
+from pet.counters import pet_view_counter
+from pet.models import Pet
+from review.derivatives import (
+    DerivativeGenerator,
+    derivative_generator,
+    derivative_name,
+    derivative_path,
+)
+from review.models import Review
+from review.storage import LocalImageStorage, get_image_storage
+from review.uploads import ReviewImageUploader, spool_image, spool_path
+
+User = get_user_model()
+
+
+class ReviewAggregateCacheTests(TestCase):
+    """A review refreshes its pet and the pet lists, not the whole catalog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        category = Category.objects.create(name="Dog")
+        cls.pet, cls.other = [
+            Pet.objects.create(
+                name=name,
+                breed="lab",
+                age=2,
+                description="friendly",
+                status=Pet.APPROVED,
+                visibility=Pet.PUBLIC,
+                category=category,
+            )
+            for name in ("Rex", "Max")
+        ]
+
+    def setUp(self):
+        cache.clear()
+        pet_view_counter.reset()
+        self.addCleanup(pet_view_counter.reset)
+        self.client = APIClient()
+
+    def retrieve(self, pet, **headers):
+        return self.client.get(f"/api/v1/pets/{pet.pk}/", headers=headers)
+
+    def review_counts(self):
+        response = self.client.get("/api/v1/pets/")
+        return {item["name"]: item["review_count"] for item in response.data["results"]}
+
+    def review(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Review.objects.create(
+                pet=self.pet, reviewer=self.user, comments="Good"
+            )
+
+    def test_review_refreshes_its_pet(self):
+        etag = self.retrieve(self.pet)["ETag"]
+        other_etag = self.retrieve(self.other)["ETag"]
+        self.assertEqual(self.review_counts(), {"Rex": 0, "Max": 0})
+        catalog_version = get_catalog_version()
+
+        review = self.review()
+        self.assertEqual(get_catalog_version(), catalog_version)
+
+        response = self.retrieve(self.pet, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["review_count"], 1)
+        response = self.retrieve(self.other, if_none_match=other_etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.review_counts(), {"Rex": 1, "Max": 0})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.delete()
+        self.assertEqual(self.retrieve(self.pet).data["review_count"], 0)
+        self.assertEqual(self.review_counts(), {"Rex": 0, "Max": 0})
+
+
+def make_image(color="red", name="photo.png"):
+    data = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(data, format="PNG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+
+class ReviewImageTestCase(TestCase):
+    """Runs with ``LocalImageStorage`` in a temporary spool and root."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.spool_dir = os.path.join(directory, "spool")
+        self.root = os.path.join(directory, "images")
+        settings = override_settings(
+            REVIEW_IMAGE_STORAGE="review.storage.LocalImageStorage",
+            REVIEW_IMAGE_SPOOL_DIR=self.spool_dir,
+            REVIEW_IMAGE_LOCAL_ROOT=self.root,
+            REVIEW_IMAGE_DERIVATIVE_DIR=os.path.join(directory, "derivatives"),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        get_image_storage.cache_clear()
+        self.addCleanup(get_image_storage.cache_clear)
+        cache.clear()
+
+    def stored_files(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+
+class ReviewImageUploadTests(ReviewImageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        cls.pet = Pet.objects.create(
+            name="Rex",
+            breed="lab",
+            age=2,
+            description="friendly",
+            adopted_by=cls.user,
+            category=Category.objects.create(name="Dog"),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.uploader = ReviewImageUploader()
+        # The workers run synchronously on commit, on the test's connection.
+        patches = [
+            mock.patch(
+                "review.serializers.review_image_uploader.submit",
+                side_effect=self.uploader.run,
+            ),
+            mock.patch("review.uploads.close_old_connections"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def post_review(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/v1/pets/{self.pet.pk}/reviews/",
+                {"comments": "Good", "image": image},
+                format="multipart",
+            )
+
+    def test_upload(self):
+        image = make_image()
+        content = image.read()
+        image.seek(0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                f"/api/v1/pets/{self.pet.pk}/reviews/",
+                {"comments": "Good", "image": image},
+                format="multipart",
+            )
+        # Answered before the upload runs.
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["image_status"], Review.IMAGE_PENDING)
+        self.assertIsNone(response.data["image"])
+        review = Review.objects.get(pk=response.data["id"])
+        self.assertTrue(os.path.exists(spool_path(review.image_spool)))
+
+        for callback in callbacks:
+            callback()
+        review.refresh_from_db()
+        self.assertEqual(review.image_status, Review.IMAGE_READY)
+        self.assertEqual(review.image_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(review.image_spool, "")
+        self.assertEqual(self.stored_files(), [review.image])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_new_image_deletes_the_old_one(self):
+        review = Review.objects.get(pk=self.post_review(make_image()).data["id"])
+        old_name = review.image
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/v1/pets/{self.pet.pk}/reviews/{review.pk}/",
+                {"image": make_image("blue")},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200)
+        review.refresh_from_db()
+        self.assertEqual(review.image_status, Review.IMAGE_READY)
+        self.assertNotEqual(review.image, old_name)
+        self.assertEqual(self.stored_files(), [review.image])
+
+    def test_replaced_spool_discards_the_stale_upload(self):
+        review = Review.objects.create(
+            pet=self.pet,
+            reviewer=self.user,
+            comments="Good",
+            image_status=Review.IMAGE_PENDING,
+            image_spool=spool_image(make_image()),
+        )
+        stale = review.image_spool
+        # A newer image arrives while the first one is still uploading.
+        Review.objects.filter(pk=review.pk).update(
+            image_spool=spool_image(make_image("blue"))
+        )
+
+        self.assertIsNone(self.uploader.run(review.pk, stale))
+        review.refresh_from_db()
+        self.assertIsNone(review.image)
+        self.assertEqual(review.image_status, Review.IMAGE_PENDING)
+        self.assertEqual(self.stored_files(), [])
+        self.assertFalse(os.path.exists(spool_path(stale)))
+
+    def test_failed_upload(self):
+        image = make_image()
+        with mock.patch.object(
+            LocalImageStorage, "save", side_effect=OSError
+        ), self.assertLogs("review.uploads", "ERROR"):
+            response = self.post_review(image)
+        review = Review.objects.get(pk=response.data["id"])
+        self.assertEqual(review.image_status, Review.IMAGE_FAILED)
+        self.assertTrue(os.path.exists(spool_path(review.image_spool)))
+
+        out = StringIO()
+        call_command("process_review_images", stdout=out)
+        self.assertIn("Stored 0 review image(s), 0 failed.", out.getvalue())
+
+        call_command("process_review_images", "--retry-failed", stdout=out)
+        self.assertIn("Stored 1 review image(s), 0 failed.", out.getvalue())
+        review.refresh_from_db()
+        self.assertEqual(review.image_status, Review.IMAGE_READY)
+        self.assertEqual(self.stored_files(), [review.image])
+
+    def test_missing_spool_file(self):
+        review = Review.objects.create(
+            pet=self.pet,
+            reviewer=self.user,
+            comments="Good",
+            image_status=Review.IMAGE_PENDING,
+            image_spool="gone.png",
+        )
+        out = StringIO()
+        with self.assertLogs("review.uploads", "ERROR"):
+            call_command("process_review_images", stdout=out)
+        self.assertIn("Stored 0 review image(s), 1 failed.", out.getvalue())
+        review.refresh_from_db()
+        self.assertEqual(review.image_status, Review.IMAGE_FAILED)
+
+
+class ReviewImageDerivativeTests(ReviewImageTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="user", email="user@example.com")
+        cls.pet = Pet.objects.create(
+            name="Rex",
+            breed="lab",
+            age=2,
+            description="friendly",
+            category=Category.objects.create(name="Dog"),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        image = make_image()
+        content = image.read()
+        self.source = hashlib.sha256(content).hexdigest()
+        spool = spool_image(image)
+        Review.objects.create(
+            pet=self.pet,
+            reviewer=self.user,
+            comments="Good",
+            image=get_image_storage().save(spool_path(spool), spool),
+            image_hash=self.source,
+            image_status=Review.IMAGE_READY,
+        )
+        self.unknown = "0" * 64
+
+    def url(self, source, size="small", fmt="webp"):
+        return f"/api/v1/review-images/{source}/{size}.{fmt}/"
+
+    def test_derivative_name(self):
+        self.assertEqual(
+            derivative_name(self.source, "medium", "jpeg"),
+            f"{self.source[:2]}/{self.source}-800.jpeg",
+        )
+        self.assertNotEqual(
+            derivative_name(self.source, "small", "jpeg"),
+            derivative_name(self.source, "small", "webp"),
+        )
+
+    def test_get(self):
+        generator = DerivativeGenerator(max_workers=1)
+        self.addCleanup(generator.shutdown)
+
+        self.assertIsNone(generator.get(self.unknown, "small", "jpeg"))
+        path = generator.get(self.source, "small", "jpeg")
+        self.assertEqual(path, derivative_path(self.source, "small", "jpeg"))
+        with Image.open(path) as thumbnail:
+            self.assertEqual(thumbnail.format, "JPEG")
+            self.assertLessEqual(max(thumbnail.size), 320)
+
+        # Served from disk afterwards, without looking up the review.
+        with self.assertNumQueries(0), mock.patch.object(
+            generator, "generate"
+        ) as generate:
+            self.assertEqual(generator.get(self.source, "small", "jpeg"), path)
+        generate.assert_not_called()
+
+    def test_endpoint(self):
+        self.addCleanup(derivative_generator.shutdown)
+        response = self.client.get(self.url(self.source))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertEqual(b"".join(response.streaming_content)[:4], b"RIFF")
+        response.close()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url(self.source), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_unknown_source(self):
+        self.assertEqual(self.client.get(self.url(self.unknown)).status_code, 404)
+        etag = f'"{derivative_name(self.unknown, "small", "webp")}"'
+        response = self.client.get(self.url(self.unknown), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
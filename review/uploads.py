@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from api.cache import invalidate_model
+from review.models import Review
+from review.storage import get_image_storage
+
+logger = logging.getLogger(__name__)
+
+
+def spool_path(spool):
+    return os.path.join(settings.REVIEW_IMAGE_SPOOL_DIR, spool)
+
+
+def spool_image(uploaded_file):
+    """
+    Write an uploaded image to the local spool and return its spool name.
+    This is the only file work left on the request thread.
+    """
+    extension = os.path.splitext(uploaded_file.name or "")[1].lower()
+    spool = f"{uuid.uuid4().hex}{extension}"
+    os.makedirs(settings.REVIEW_IMAGE_SPOOL_DIR, exist_ok=True)
+    partial = spool_path(f"{spool}.part")
+    with open(partial, "wb") as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    # Workers never see a half written file.
+    os.replace(partial, spool_path(spool))
+    return spool
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def discard_spool(spool):
+    try:
+        os.remove(spool_path(spool))
+    except FileNotFoundError:
+        pass
+
+
+def store_review_image(review_id, spool):
+    """
+    Push a spooled image to the storage backend and point the review at it.
+    Returns the new ``image_status``, or None when the review was deleted or
+    got another image in the meantime.
+    """
+    path = spool_path(spool)
+    if not os.path.exists(path):
+        logger.error("Spooled image of review %s is missing", review_id)
+        return _mark_failed(review_id, spool)
+
+    storage = get_image_storage()
+    try:
+        image_hash = hash_file(path)
+        name = storage.save(path, spool)
+    except Exception:
+        logger.exception("Failed to store the image of review %s", review_id)
+        return _mark_failed(review_id, spool)
+
+    with transaction.atomic():
+        previous = (
+            Review.objects.select_for_update()
+            .filter(pk=review_id, image_spool=spool)
+            .values_list("image", flat=True)
+            .first()
+        )
+        stored = Review.objects.filter(pk=review_id, image_spool=spool).update(
+            image=name,
+            image_hash=image_hash,
+            image_status=Review.IMAGE_READY,
+            image_spool="",
+        )
+    discard_spool(spool)
+    if stored:
+        invalidate_model(Review)
+
+    # Whatever is no longer referenced by a review.
+    stale = name if not stored else previous
+    if stale:
+        try:
+            storage.delete(stale)
+        except Exception:
+            logger.exception("Failed to delete review image %s", stale)
+    return Review.IMAGE_READY if stored else None
+
+
+def _mark_failed(review_id, spool):
+    failed = Review.objects.filter(pk=review_id, image_spool=spool).update(
+        image_status=Review.IMAGE_FAILED
+    )
+    if failed:
+        invalidate_model(Review)
+    return Review.IMAGE_FAILED if failed else None
+
+
+class ReviewImageUploader:
+    """
+    Background pool that moves spooled review images to the storage backend,
+    so creating or editing a review never waits on the remote upload.
+
+    Uploads still queued when the process dies stay ``pending`` with their
+    spool file in place. ``process_review_images`` finishes them, but only
+    where it can read that file: on the same host, or anywhere when
+    ``REVIEW_IMAGE_SPOOL_DIR`` is a shared volume. On Vercel the spool is
+    the instance's own temp dir, so an upload stalled in a frozen instance
+    only finishes if that instance resumes; run elsewhere, the command marks
+    it failed and the image has to be sent again.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers
+                    or settings.REVIEW_IMAGE_UPLOAD_WORKERS,
+                    thread_name_prefix="review-image",
+                )
+            return self.executor
+
+    def submit(self, review_id, spool):
+        return self.get_executor().submit(self.run, review_id, spool)
+
+    def schedule(self, review):
+        """Queue the spooled image of ``review`` once the transaction commits."""
+        review_id, spool = review.pk, review.image_spool
+        transaction.on_commit(lambda: self.submit(review_id, spool))
+
+    def run(self, review_id, spool):
+        close_old_connections()
+        try:
+            return store_review_image(review_id, spool)
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+review_image_uploader = ReviewImageUploader()
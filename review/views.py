@@ -1,5 +1,15 @@
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from api.mixins import ConditionalGetMixin, ValuesListMixin
+from review.derivatives import (
+    DERIVATIVE_FORMATS,
+    DERIVATIVE_SIZES,
+    derivative_exists,
+    derivative_generator,
+    derivative_name,
+)
 from review.fitlers import ReviewFilter
 from review.paginations import ReviewPagination
 from .models import Review
@@ -7,9 +17,12 @@ from .serializers import ReviewSerializer, ReviewUpdateSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 from .permissions import IsOwnerOrAdmin
+from django.contrib.auth import get_user_model
 
+User = get_user_model()
 
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     swagger_tags = ["reviews"]
     queryset = (
         Review.objects.select_related("reviewer").prefetch_related("images").all()
@@ -20,6 +33,9 @@ class ReviewViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = ReviewFilter
     ordering_fields = ["fees", "updated_at"]
+    values_actions = ["list"]
+    # Reviewer names are nested in every review.
+    etag_models = (Review, User)
 
     def get_permissions(self):
         if self.action in ["create", "partial_update", "destroy"]:
@@ -59,7 +75,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
             "Submit a new review for a pet.\n\n"
             "- Requires authentication.\n"
             "- The logged-in user will be automatically assigned as the reviewer.\n"
-            "- The review will be linked to the pet identified by `pets_pk`."
+            "- The review will be linked to the pet identified by `pets_pk`.\n"
+            "- An attached `image` is uploaded in the background: the review is "
+            "returned right away with `image_status` `pending`, which becomes "
+            "`ready` once the image is stored."
         ),
     )
     def create(self, request, *args, **kwargs):
@@ -81,7 +100,8 @@ class ReviewViewSet(viewsets.ModelViewSet):
         operation_description=(
             "Partially update details of an existing review by ID.\n\n"
             "- Requires authentication.\n"
-            "- Only the review owner or an admin can update the review."
+            "- Only the review owner or an admin can update the review.\n"
+            "- A new `image` is uploaded in the background, see review creation."
         ),
     )
     def partial_update(self, request, *args, **kwargs):
@@ -97,3 +117,51 @@ class ReviewViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+
+class ReviewImageViewSet(viewsets.ViewSet):
+    swagger_tags = ["reviews"]
+    permission_classes = [permissions.AllowAny]
+    lookup_field = "source"
+    lookup_value_regex = "[0-9a-f]{64}"
+
+    @swagger_auto_schema(
+        operation_summary="Review image thumbnail",
+        operation_description=(
+            "Serve a resized WebP or JPEG copy of a review image.\n\n"
+            "- `source` is the SHA-256 of the original image; use the URLs in a "
+            "review's `thumbnails` instead of building them.\n"
+            "- `small` fits in 320px and `medium` in 800px.\n"
+            "- Generated on first request, then served from disk. The content "
+            "never changes, so responses may be cached forever."
+        ),
+    )
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path=(
+            rf"(?P<size>{'|'.join(DERIVATIVE_SIZES)})"
+            rf"\.(?P<fmt>{'|'.join(DERIVATIVE_FORMATS)})"
+        ),
+    )
+    def derivative(self, request, source=None, size=None, fmt=None):
+        etag = f'"{derivative_name(source, size, fmt)}"'
+        headers = {
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": etag,
+        }
+        if request.headers.get("If-None-Match") == etag:
+            # Any 64 hex digits match the route, so only confirm images
+            # that exist.
+            if not derivative_exists(source, size, fmt):
+                raise Http404
+            return HttpResponseNotModified(headers=headers)
+
+        path = derivative_generator.get(source, size, fmt)
+        if path is None:
+            raise Http404
+        return FileResponse(
+            open(path, "rb"),
+            content_type=DERIVATIVE_FORMATS[fmt],
+            headers=headers,
+        )
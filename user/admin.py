@@ -1,4 +1,5 @@
 from django.contrib import admin
+from payment.ledger import with_balances
 from user.models import CustomUser
 
 # Register your models here.
@@ -15,6 +16,7 @@ class CustomUserAdmin(admin.ModelAdmin):
         "is_active",
     ]
     search_fields = ("username", "email", "first_name", "last_name")
+    readonly_fields = ("balance",)
 
     fieldsets = (
         (
@@ -56,3 +58,6 @@ class CustomUserAdmin(admin.ModelAdmin):
             },
         ),
     )
+
+    def get_queryset(self, request):
+        return with_balances(super().get_queryset(request))
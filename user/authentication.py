@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+    TokenError,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# Claims copied into tokens so requests can be authorized without loading
+# the user.
+USER_CLAIMS = ("is_staff", "is_active")
+# ``CustomUser.auth_version`` the claims were read at; fields loaded from the
+# user cache later must be at least that recent.
+VERSION_CLAIM = "auth_version"
+USER_CACHE_TIMEOUT = 60 * 5
+
+
+def _user_key(pk):
+    return f"user:auth:{pk}"
+
+
+def _cached_attnames():
+    # The password hash is not worth spreading to the cache.
+    return [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname != "password"
+    ]
+
+
+def get_user_fields(pk, version=None):
+    """
+    Field values of the user ``pk`` from the cache, or the database when
+    they are missing or older than ``version``.
+    """
+    fields = cache.get(_user_key(pk))
+    if fields is None or (version is not None and fields["auth_version"] < version):
+        fields = User.objects.filter(pk=pk).values(*_cached_attnames()).first()
+        if fields is not None:
+            cache.set(_user_key(pk), fields, USER_CACHE_TIMEOUT)
+    return fields
+
+
+def forget_user(pk):
+    """Drop the cached fields of user ``pk``."""
+    cache.delete(_user_key(pk))
+
+
+def has_claims(token):
+    return all(claim in token for claim in (*USER_CLAIMS, VERSION_CLAIM))
+
+
+def build_user(values):
+    """
+    A ``User`` with only ``values`` (attname -> value) loaded; any other
+    field is read from the user cache the first time it is accessed, see
+    ``CustomUser.refresh_from_db``.
+    """
+    attnames = [
+        field.attname for field in User._meta.concrete_fields if field.attname in values
+    ]
+    user = User.from_db(
+        router.db_for_read(User), attnames, [values[name] for name in attnames]
+    )
+    user.deferred_from_cache = True
+    return user
+
+
+def user_from_claims(token):
+    values = {claim: token[claim] for claim in (*USER_CLAIMS, VERSION_CLAIM)}
+    values["id"] = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+    return build_user(values)
+
+
+def load_deferred_fields(user, fields):
+    """
+    Fill every deferred field of ``user`` from the user cache. Returns the
+    names of ``fields`` that are still deferred.
+    """
+    cached = get_user_fields(user.pk, user.__dict__.get("auth_version"))
+    if cached is not None:
+        for attname in user.get_deferred_fields():
+            if attname in cached:
+                user.__dict__[attname] = cached[attname]
+    deferred = user.get_deferred_fields()
+    return [name for name in fields if name in deferred]
+
+
+def user_from_cache(user_id):
+    try:
+        pk = User._meta.pk.to_python(user_id)
+    except ValidationError:
+        return None
+    fields = get_user_fields(pk)
+    return build_user(fields) if fields is not None else None
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the current user claims. This is
+    where changes to the user reach the claims: no access token is issued
+    for inactive or deleted users.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in (*USER_CLAIMS, VERSION_CLAIM):
+            token[claim] = getattr(user, claim)
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Read from the database: claims must never come from a stale cache.
+        fields = (
+            User.objects.filter(
+                pk=User._meta.pk.to_python(self[api_settings.USER_ID_CLAIM])
+            )
+            .values(*USER_CLAIMS, VERSION_CLAIM)
+            .first()
+        )
+        if fields is None or not fields["is_active"]:
+            raise TokenError("User is inactive or deleted")
+        access.payload.update(fields)
+        return access
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that takes ``id``, ``is_staff`` and ``is_active``
+    from the signed token instead of loading the user on every request.
+
+    The claims are trusted for the lifetime of the access token, so an
+    authenticated request makes no query for the user. Changes to the user,
+    deactivation included, take effect when the client next refreshes, at
+    most ``ACCESS_TOKEN_LIFETIME`` later, see ``ClaimsRefreshToken``. Other
+    user fields are read from a short lived cache the first time a view
+    touches them.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which is never cached.
+            return super().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if has_claims(validated_token):
+            user = user_from_claims(validated_token)
+        else:
+            # Issued without claims, e.g. before they were added.
+            user = user_from_cache(validated_token[api_settings.USER_ID_CLAIM])
+            if user is None:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
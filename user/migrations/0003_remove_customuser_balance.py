@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_alter_customuser_balance'),
+        # Balances are copied into the ledger first.
+        ('payment', '0006_ledger'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='balance',
+        ),
+    ]
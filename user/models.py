@@ -1,16 +1,63 @@
 from django.db import models
+from django.db.models import F
 from uuid import uuid4
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 
+from api.cache import invalidate_model
 
 # Create your models here.
 
 
+class CustomUserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Bulk updates skip save() and the signals, so bump here as well.
+        kwargs.setdefault("auth_version", F("auth_version") + 1)
+        invalidate_model(self.model)
+        return super().update(**kwargs)
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
+
 class CustomUser(AbstractUser):
 
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    # Copied into access tokens; any change to the user bumps it, so user
+    # fields cached before the change are reloaded, see
+    # user/authentication.py.
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CustomUserManager()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.auth_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "auth_version"}
+        super().save(*args, **kwargs)
+
+    @property
+    def balance(self):
+        # Kept in the payment ledger, see payment/ledger.py. Querysets
+        # annotated with with_balances() avoid a query per user.
+        if hasattr(self, "ledger_balance"):
+            return self.ledger_balance
+        from payment.ledger import get_balance
+
+        return get_balance(self)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users authenticated from token claims read their other fields from
+        # the user cache in one go, see user/authentication.py.
+        if fields is not None and getattr(self, "deferred_from_cache", False):
+            from user.authentication import load_deferred_fields
 
-    balance = models.FloatField(max_length=50, default=0.0)
+            fields = load_deferred_fields(self, fields)
+            if not fields:
+                return
+        super().refresh_from_db(using, fields, from_queryset)
 
     def __str__(self) -> str:
-        return f"{self.first_name} {self.last_name} {self.balance}"
+        return f"{self.first_name} {self.last_name}"
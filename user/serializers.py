@@ -1,8 +1,14 @@
 from django.contrib.auth import get_user_model
 from djoser import serializers as sr
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 from pet import serializers as pet_serializers
 from pet.models import Adoption, Pet
+from user.authentication import ClaimsRefreshToken
 
 User = get_user_model()
 
@@ -34,9 +40,26 @@ class UserSerializer(sr.UserSerializer):
 
 
 class CurrentUserSerializer(UserSerializer):
+    balance = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
 
     class Meta(UserSerializer.Meta):
 
         model = User
         fields = UserSerializer.Meta.fields + ["balance"]
         read_only_fields = ["balance"]
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        try:
+            return super().validate(attrs)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save
+from api.cache import invalidate_model
+from user.authentication import forget_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    # Reviewer names are part of the review ETags.
+    invalidate_model(User)
@@ -1,3 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
 
-# Create your tests here.
+from user.authentication import ClaimsJWTAuthentication, ClaimsRefreshToken
+
+User = get_user_model()
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username="staff", email="staff@example.com", is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authentication = ClaimsJWTAuthentication()
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+
+    def authenticate(self, token):
+        return self.authentication.get_user(token)
+
+    def refresh_access(self):
+        return APIClient().post(
+            "/api/v1/auth/jwt/refresh/", {"refresh": str(self.refresh)}
+        )
+
+    def test_claims_need_no_query(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate(self.access)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_staff)
+            self.assertTrue(user.is_active)
+
+    def test_claims_are_trusted_until_refresh(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.authenticate(self.access).is_staff)
+
+        access = self.refresh.access_token
+        with self.assertNumQueries(0):
+            self.assertFalse(self.authenticate(access).is_staff)
+
+    def test_save_reaches_claims_on_refresh(self):
+        self.user.is_staff = False
+        self.user.save(update_fields=["is_staff"])
+        self.assertFalse(self.authenticate(self.refresh.access_token).is_staff)
+
+    def test_other_fields_are_loaded_once(self):
+        user = self.authenticate(self.access)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "staff@example.com")
+            self.assertEqual(user.username, "staff")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(self.access).email, "staff@example.com")
+
+    def test_cache_older_than_the_claims_is_reloaded(self):
+        # Cache the fields, then change the user behind its back.
+        self.authenticate(self.access).email
+        User.objects.filter(pk=self.user.pk).update(email="new@example.com")
+        user = self.authenticate(self.refresh.access_token)
+        self.assertEqual(user.email, "new@example.com")
+
+    def test_token_without_claims(self):
+        access = self.access
+        del access["is_staff"]
+        with self.assertNumQueries(1):
+            self.assertTrue(self.authenticate(access).is_staff)
+
+    def test_deactivated_user_cannot_refresh(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(TokenError):
+            self.refresh.access_token
+        self.assertEqual(self.refresh_access().status_code, 401)
+
+    def test_deleted_user_cannot_refresh(self):
+        User.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(TokenError):
+            self.refresh.access_token
+        self.assertEqual(self.refresh_access().status_code, 401)
+
+    def test_deleted_user_without_claims_is_rejected(self):
+        access = self.access
+        del access["is_staff"]
+        User.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+
+    def test_refresh_endpoint_issues_current_claims(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.refresh_access()
+        self.assertEqual(response.status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        with self.assertNumQueries(0):
+            user = self.authentication.authenticate(client.get("/").wsgi_request)[0]
+        self.assertFalse(user.is_staff)